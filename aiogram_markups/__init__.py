@@ -1,5 +1,7 @@
 from aiogram_markups.core.button import Button
 from aiogram_markups.core.helpers import MarkupType, Orientation
+from aiogram_markups.core.text import TextTemplate
+from aiogram_markups.core.utils import blocking
 from aiogram_markups.markup import Markup
 
-from .configuration import setup_aiogram_keyboards
+from .configuration import setup_aiogram_keyboards, shutdown_aiogram_keyboards
@@ -1 +1 @@
-from .validator import String
\ No newline at end of file
+from .validator import String, Integer, Float
@@ -1,8 +1,10 @@
-from typing import Union, Iterable, Protocol
+import re
+from typing import Union, Iterable, Protocol, Optional
 
 from aiogram.types import Message
 
 from aiogram_markups.validator import Validator
+from aiogram_markups.core.utils import synchronous
 from aiogram_markups.core.dialog_meta import DialogMeta
 
 
@@ -18,17 +20,23 @@ class String(Validator):
     def __init__(self, text: Union[str, Iterable[str]] = None):
         if text is None:
             text = set()
-        
+
         if isinstance(text, str):
             text = {text}
 
-        self.text = set(text)
+        self.text = frozenset(text)
 
     async def validate(self, meta: 'DialogMeta') -> bool:
+        return self.check(meta)
+
+    @synchronous
+    def check(self, meta: 'DialogMeta') -> bool:
+        """ Synchronous validation, engine calls it without awaiting """
+
         if not self.text:
             if isinstance(meta.source, Message):
-                return ((meta.source.content_type == 'text')
-                        & (self.null_validate(meta.content)))
+                return (meta.source.content_type == 'text'
+                        and self.null_validate(meta.content))
             else:
                 return self.null_validate(meta.content)
 
@@ -36,38 +44,25 @@ class String(Validator):
             return meta.content in self.text
 
     @staticmethod
-    def null_validate(content):
+    def null_validate(content: Optional[str]) -> bool:
         """ Validate with null setup content """
 
         return bool(content)
 
 
 class Integer(String):
+    PATTERN = re.compile(r'[+-]?\d+')
+
     def __init__(self, numbers: Union[IntAble, Iterable[IntAble]] = None):
         if numbers is None:
             numbers = []
 
         super().__init__(map(str, numbers))
 
-    async def validate(self, meta: 'DialogMeta') -> bool:
-        result = await super().validate(meta)
-        return result
-
-    @staticmethod
-    def null_validate(content):
-        return content.isnumeric()
+    @classmethod
+    def null_validate(cls, content: Optional[str]) -> bool:
+        return content is not None and cls.PATTERN.fullmatch(content) is not None
 
 
-class Float(String):
-    def __init__(self, numbers: Union[FloatAble, Iterable[IntAble]] = None):
-        if numbers is None:
-            numbers = []
-
-        super().__init__(map(str, numbers))
-
-    async def validate(self, meta: 'DialogMeta') -> bool:
-        return await super().validate(meta)
-
-    @staticmethod
-    def null_validate(content):
-        return content.isnumeric()
+class Float(Integer):
+    PATTERN = re.compile(r'[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?')
@@ -1,28 +1,138 @@
-from typing import Optional
+from typing import Optional, Callable, Literal, TYPE_CHECKING
 
 from aiogram import Dispatcher
 from loguru import logger
 
 
+if TYPE_CHECKING:
+    from aiogram_markups.core.scheduler import ChatScheduler
+
+
 DP: Optional[Dispatcher] = None
+DISPATCHERS: list[Dispatcher] = []
+REGISTRATIONS: list[Callable[[Dispatcher], None]] = []
+SCHEDULERS: dict[Dispatcher, 'ChatScheduler'] = {}
 logger = logger
 
 
-def setup_aiogram_keyboards(dp: Dispatcher):
+def setup_aiogram_keyboards(dp: Dispatcher,
+                            buffer_states: bool = False,
+                            scheduler: 'ChatScheduler' = None,
+                            answer_callbacks: Literal['auto', 'webhook'] = None,
+                            loop_lag_interval: float = None):
+    """Setup function
+
+    Activates markups on dispatcher.  Can be called for several
+    dispatchers: markups are declared once and all handlers, that
+    was registered via markups, attached to each of them.
+
+    :param dp: dispatcher
+    :param buffer_states: wrap dispatcher storage with `BufferedStorage`,
+        so states are loaded once and saved once per update (`update_data`
+        is saved as delta, `set_state` and `set_data` - last write wins)
+    :param scheduler: process updates within `ChatScheduler`, to limit
+        concurrency per chat and in total
+    :param answer_callbacks: answer callback queries of buttons without
+        `on_callback`: 'auto' - concurrently with handler, 'webhook' - in
+        webhook response, without request to Bot API (while dispatcher
+        is polling, there is no webhook response, so answer is sent as
+        with 'auto')
+    :param loop_lag_interval: observe event loop lag (metric `loop.lag`)
+        each `loop_lag_interval` seconds, until `shutdown_aiogram_keyboards`
+
+    """
+
     global DP
 
     from aiogram_markups.core.middleware import KeyboardStatesMiddleware
+    from aiogram_markups.core.storage import BufferedStorage
+
+    if dp in DISPATCHERS:
+        logger.warning('Aiogram Keyboards already activated on this dispatcher')
+        return
+
+    if buffer_states and not isinstance(dp.storage, BufferedStorage):
+        dp.storage = BufferedStorage(dp.storage)
+
+    if scheduler is not None:
+        SCHEDULERS[dp] = scheduler
 
-    dp.setup_middleware(KeyboardStatesMiddleware(dp))
+    dp.setup_middleware(KeyboardStatesMiddleware(dp,
+                                                 answer_callbacks=answer_callbacks,
+                                                 loop_lag_interval=loop_lag_interval))
+    DISPATCHERS.append(dp)
     DP = dp
 
+    for registration in REGISTRATIONS:
+        registration(dp)
+
     logger.info('Aiogram Keyboards successfully activated')
 
 
-def get_dp() -> Dispatcher:
+async def shutdown_aiogram_keyboards(dp: Dispatcher) -> None:
+    """Shutdown function
+
+    Deactivates markups on dispatcher and releases its resources
+    (loop lag monitor).  Signature fits `on_shutdown` of executor:
+
+    >>> executor.start_polling(dp, on_shutdown=shutdown_aiogram_keyboards)
+
+    Handlers and middleware of markups stay registered on
+    dispatcher (aiogram has no way to unregister middleware),
+    so dispatcher must not process updates after shutdown and
+    must not be set up again.
+
+    """
+
     global DP
 
-    if DP is not None:
+    from aiogram_markups.core.middleware import KeyboardStatesMiddleware
+
+    for i in dp.middleware.applications:
+        if isinstance(i, KeyboardStatesMiddleware):
+            i.close()
+
+    if dp in DISPATCHERS:
+        DISPATCHERS.remove(dp)
+
+    SCHEDULERS.pop(dp, None)
+
+    if DP is dp:
+        DP = DISPATCHERS[-1] if DISPATCHERS else None
+
+    return None
+
+
+def register(registration: Callable[[Dispatcher], None]) -> None:
+    """Register function
+
+    Apply registration (handler registration, as a rule) to
+    all activated dispatchers and remember it for dispatchers,
+    that will be activated later.
+
+    """
+
+    REGISTRATIONS.append(registration)
+
+    for dp in DISPATCHERS:
+        registration(dp)
+
+    return None
+
+
+def get_dp() -> Dispatcher:
+    """Get dispatcher function
+
+    Returns dispatcher that processes current update.  Out of
+    update processing, returns the last activated dispatcher.
+
+    """
+
+    current = Dispatcher.get_current()
+
+    if current is not None and current in DISPATCHERS:
+        return current
+    elif DP is not None:
         return DP
     else:
         logger.critical("Aiogram Keyboards don't installed - Dispatcher not found")
@@ -1,17 +1,20 @@
 import typing
 from typing import Any, Union, Callable, Iterable, Optional, Awaitable
+import inspect
 import traceback
 
+from aiogram import Dispatcher
 from aiogram.types import InlineKeyboardButton, CallbackQuery, Message
 from aiogram.dispatcher.filters.builtin import Filter
-from aiogram.dispatcher.filters import Command, StateFilter, Text
 
 from ..configuration import get_dp, logger
 
 from .tools.bind import bind, bind_target_alias
 from .tools.handle import handle
-from .utils import BoolFilter, hash_text
+from .utils import (BoolFilter, CurrentStateFilter, CommandsFilter, TextsFilter, TextNormalizer,
+                    ValidatorFilter, compile_texts, hash_text, run_validator)
 from .dialog_meta import meta_able_alias, DialogMeta
+from .filters import AllOf, ContentFilter, compile_filter
 
 
 def group_content_filter(*buttons: 'Button'):
@@ -25,10 +28,7 @@ def group_content_filter(*buttons: 'Button'):
     if len(buttons) == 0:
         return BoolFilter(True)
 
-    result = BoolFilter(False)
-
-    for i in buttons:
-        result = result.__or__(i.check_content)
+    result = ContentFilter(buttons)
 
     return result
 
@@ -59,6 +59,11 @@ class DefinitionScope:
 
     >>> scope = DefinitionScope(state='test')
 
+    Commands and texts are compiled to frozensets, so scope
+    check and conflicts detection are sets operations.  Filter
+    of scope is compiled once and recompiled only after its
+    fields are set.
+
     """
 
     def __init__(self,
@@ -67,43 +72,78 @@ class DefinitionScope:
                  text: Iterable[str] = None,
                  extra_filters: list[Callable] = None):
 
+        self._filter = None
+
         self.commands = commands
         self.state = state
         self.text = text
         self.extra_filters = extra_filters or []
 
     @property
-    def filter(self):
-        result = BoolFilter(True)
-        dp = get_dp()
+    def commands(self) -> Optional[frozenset[str]]:
+        return self._commands
 
-        def add_condition(*filters: Callable):
-            nonlocal result
+    @commands.setter
+    def commands(self, value: Optional[Iterable[str]]) -> None:
+        self._commands = compile_texts(value, lower=True)
+        self._filter = None
 
-            for i in filters:
-                result = result.__and__(i)
+    @property
+    def state(self) -> Optional[str]:
+        return self._state
 
-            return None
+    @state.setter
+    def state(self, value: Optional[str]) -> None:
+        self._state = value
+        self._filter = None
+
+    @property
+    def text(self) -> Optional[frozenset[str]]:
+        return self._text
+
+    @text.setter
+    def text(self, value: Optional[Iterable[str]]) -> None:
+        self._text = compile_texts(value)
+        self._filter = None
+
+    @property
+    def extra_filters(self) -> tuple[Callable, ...]:
+        return self._extra_filters
+
+    @extra_filters.setter
+    def extra_filters(self, value: Iterable[Callable]) -> None:
+        self._extra_filters = tuple(value)
+        self._filter = None
+
+    @property
+    def filter(self):
+        if self._filter is None:
+            self._filter = self._compile_filter()
+
+        return self._filter
+
+    def _compile_filter(self):
+        conditions = []
 
         if self.commands is not None:
-            add_condition(Command(commands=self.commands))
+            conditions.append(CommandsFilter(self.commands))
         if self.state is not None:
-            add_condition(StateFilter(dp, self.state))
+            conditions.append(CurrentStateFilter(self.state))
         if self.text is not None:
-            add_condition(Text(self.text))
+            conditions.append(TextsFilter(self.text))
+
+        conditions.extend(self.extra_filters)
 
-        add_condition(*self.extra_filters)
+        result = compile_filter(AllOf(*conditions))
 
         return result
 
     def is_conflicts(self, other: 'DefinitionScope') -> bool:
-        def eq_or_have_intersection(a: Iterable, b: Iterable):
-            if a == b:
-                return True
+        def eq_or_have_intersection(a: Optional[frozenset], b: Optional[frozenset]):
+            if a is None or b is None:
+                return a is b
             else:
-                intersections = set(a).intersection(b)
-
-                return bool(intersections)
+                return not a.isdisjoint(b)
 
         collisions = [
             self.state == other.state,
@@ -115,10 +155,11 @@ class DefinitionScope:
 
         return result
 
-    async def set_state(self, meta: meta_able_alias):
+    async def set_state(self, meta: meta_able_alias, dp: Dispatcher = None):
         meta = DialogMeta(meta)
 
-        dp = get_dp()
+        if dp is None:
+            dp = get_dp()
         state = dp.current_state(chat=meta.chat_id, user=meta.from_user.id)
 
         await state.set_state(self.state)
@@ -137,10 +178,23 @@ class Button:
     >>> button.text
     'My button'
 
+    Button can have localized labels.  It is still one button
+    (one callback data, one handler), label is chosen by user
+    locale on render, and any label is matched on input.
+
+    >>> button = Button('Settings', labels={'ru': 'Настройки', 'de': 'Einstellungen'})
+    >>> button.label('ru-RU')
+    'Настройки'
+
     """
 
     CALLBACK_ROOT = '::button::'
+    NORMALIZER: Optional[TextNormalizer] = None
     _exemplars: dict[int, list['Button']] = dict()
+    _text_index: dict[str, list['Button']] = dict()
+    _hashes: set[str] = set()
+    _global_validators: dict[int, 'Button'] = dict()
+    _text_keys: frozenset[Optional[str]] = frozenset()
 
     def __init__(self,
                  text: Optional[str],
@@ -149,13 +203,18 @@ class Button:
                  definition_scope: DefinitionScope = None,
                  on_callback: str = None,
                  orientation: int = None,
-                 validator: Callable[['DialogMeta'], Awaitable[bool]] = None,
-                 is_global: bool = None) -> None:
+                 validator: Callable[['DialogMeta'], Union[bool, Awaitable[bool]]] = None,
+                 is_global: bool = None,
+                 labels: dict[str, str] = None,
+                 debounce: float = None) -> None:
 
         """Button initialization method
 
         You can give as text any obj, it will be replaced on str(obj)
 
+        If debounce (seconds) is set, repeated presses of button in
+        same message (same text in chat) within this window are dropped
+
         """
 
         self.text = text
@@ -165,6 +224,8 @@ class Button:
         self.orientation = orientation
         self.validator = validator
         self.is_global = is_global
+        self.labels = dict(labels or {})
+        self.debounce = debounce
 
         self._definition_scope = definition_scope
 
@@ -173,6 +234,34 @@ class Button:
     def __call__(self, *args, **kwargs):
         return self.handle(*args)
 
+    @property
+    def validator(self) -> Optional[Callable[['DialogMeta'], Union[bool, Awaitable[bool]]]]:
+        return self._validator
+
+    @validator.setter
+    def validator(self, new: Optional[Callable[['DialogMeta'], Union[bool, Awaitable[bool]]]]) -> None:
+        self._validator = new
+        self._index_global()
+
+    @property
+    def is_global(self) -> Optional[bool]:
+        return self._is_global
+
+    @is_global.setter
+    def is_global(self, new: Optional[bool]) -> None:
+        self._is_global = new
+        self._index_global()
+
+    def _index_global(self) -> None:
+        """ Keep global buttons with validator apart, to search them without full scan """
+
+        if getattr(self, '_is_global', None) and getattr(self, '_validator', None) is not None:
+            self._global_validators[id(self)] = self
+        else:
+            self._global_validators.pop(id(self), None)
+
+        return None
+
     @property
     def definition_scope(self) -> Optional[DefinitionScope]:
         return self._definition_scope
@@ -195,13 +284,12 @@ class Button:
 
         definition_scope = self.definition_scope or DefinitionScope(state='*')
 
-        content_filter = group_content_filter(self, *self._linked)
-        context_filter = definition_scope.filter
-
-        result = context_filter.__and__(content_filter)
+        conditions = [definition_scope.filter, group_content_filter(self, *self._linked)]
 
         if self.validator is not None:
-            result = result.__and__(self.validator)
+            conditions.append(ValidatorFilter(self.validator))
+
+        result = compile_filter(AllOf(*conditions))
 
         return result
 
@@ -216,16 +304,43 @@ class Button:
         """
 
         if isinstance(obj, Message):
-            result = obj.text == self.text
+            result = self._text_key(obj.text) in self._text_keys
         elif isinstance(obj, CallbackQuery):
             result = obj.data == self.inline().callback_data
         elif isinstance(obj, DialogMeta):
-            result = obj.content == self.text
+            result = self._text_key(obj.content) in self._text_keys
         else:
             result = False
 
         return result
 
+    @property
+    def texts(self) -> list[Optional[str]]:
+        """ Button text and all its localized labels """
+
+        result = [self.text, *self.labels.values()]
+
+        return result
+
+    def label(self, locale: Optional[str] = None) -> Optional[str]:
+        """Get label method
+
+        Returns label for locale (IETF tag, like `pt-BR`), falls
+        back to its primary language (`pt`) and then to button text.
+
+        """
+
+        if locale is None or not self.labels:
+            return self.text
+
+        if locale in self.labels:
+            return self.labels[locale]
+
+        primary = locale.split('-')[0]
+        result = self.labels.get(primary, self.text)
+
+        return result
+
     def alias(self, text: Any,
               ignore_state: bool = True,
               on_callback: str = None):
@@ -285,11 +400,12 @@ class Button:
 
         return hash(self) == hash(other)
 
-    def inline(self, data_prefix: str = CALLBACK_ROOT) -> InlineKeyboardButton:
+    def inline(self, data_prefix: str = CALLBACK_ROOT, locale: str = None) -> InlineKeyboardButton:
         """Convert to same inline button
 
         Callback data creating automatically
         It include default prefix and hash of button content
+        (button text, so it is the same for all locales)
 
         You can configure data_prefix, but he must end on colon (`:`)
         Do not configure it if you don't know what you do!
@@ -301,7 +417,7 @@ class Button:
                              f'but `{data_prefix}` got')
 
         callback_data = data_prefix + hash_text(self.text)
-        result = InlineKeyboardButton(self.text, callback_data=callback_data)
+        result = InlineKeyboardButton(self.label(locale), callback_data=callback_data)
 
         return result
 
@@ -315,6 +431,9 @@ class Button:
         _exemplar = super().__new__(cls)
         _exemplar.__init__(*args, **kwargs)
 
+        cls._hashes.add(hash_text(_exemplar.text))
+        cls._index_text(_exemplar)
+
         if _exemplar.__content_hash__() in cls._exemplars.keys():
             cls._exemplars[_exemplar.__content_hash__()].append(_exemplar)
 
@@ -326,6 +445,42 @@ class Button:
 
         return _exemplar
 
+    @classmethod
+    def _text_key(cls, text: Optional[str]) -> Optional[str]:
+        if cls.NORMALIZER is None:
+            return text
+
+        return cls.NORMALIZER(text)
+
+    @classmethod
+    def _index_text(cls, button: 'Button') -> None:
+        button._text_keys = frozenset(cls._text_key(i) for i in button.texts)
+
+        for key in button._text_keys:
+            cls._text_index.setdefault(key, []).append(button)
+
+        return None
+
+    @classmethod
+    def set_normalizer(cls, normalizer: Optional[TextNormalizer]) -> None:
+        """Set normalizer method
+
+        Set policy of texts matching (exact, if None) and
+        rebuild texts index of all buttons.
+
+        >>> Button.set_normalizer(TextNormalizer(casefold=False))
+
+        """
+
+        cls.NORMALIZER = normalizer
+        cls._text_index = dict()
+
+        for lst in cls._exemplars.values():
+            for i in lst:
+                cls._index_text(i)
+
+        return None
+
     def _warn_definition_conflicts(self, locate_warnings: bool = True) -> bool:
         """Check conflicts method
 
@@ -397,28 +552,57 @@ class Button:
         Returns a button, if button with same text exists
         Else, raise KeyError
 
+        Texts are compared after normalization (see `set_normalizer`).
+        Localized labels are indexed too, so text of any locale
+        resolves to its button.
+
         """
 
-        hash_ = int(hash_text(text), base=16)
-        result = cls._from_hash(hash_)
+        key = cls._text_key(text)
+
+        if key not in cls._text_index:
+            raise KeyError(f'Button with text `{text}` not exists')
+
+        result = cls._text_index[key]
 
         return result
 
     @classmethod
     async def _search_by_validator(cls, obj: typing.Union[CallbackQuery, Message]):
-        for lst in cls._exemplars.values():
-            for i in lst:
+        for i in list(cls._global_validators.values()):
+            result = run_validator(i.validator, DialogMeta(obj))
 
-                if not i.is_global:
-                    continue
-                if not i.validator:
-                    continue
+            if inspect.isawaitable(result):
+                result = await result
 
-                if await i.validator(DialogMeta(obj)):
-                    return i
+            if result:
+                return i
 
         return None
 
+    @classmethod
+    def is_known(cls, obj: typing.Union[CallbackQuery, Message]) -> bool:
+        """Is known method
+
+        Check, if telegram object can be press of any button: its
+        text or callback data hash is known, or there are global
+        buttons with validator.  Check is constant time, so updates
+        of other content leave engine without full search.
+
+        """
+
+        if cls._global_validators:
+            return True
+
+        if isinstance(obj, Message):
+            result = obj.text is not None and cls._text_key(obj.text) in cls._text_index
+        elif isinstance(obj, CallbackQuery):
+            result = obj.data is not None and obj.data.rpartition(':')[2] in cls._hashes
+        else:
+            result = True
+
+        return result
+
     @classmethod
     async def from_telegram_object(cls,
                                    obj: typing.Union[CallbackQuery, Message],
@@ -433,6 +617,9 @@ class Button:
 
         # To find buttons quickly, we not guessing it by all's buttons filters.
 
+        if not cls.is_known(obj):
+            return None
+
         # In first, we choose buttons with same content.
 
         try:
@@ -475,5 +662,10 @@ class Button:
 
     def __del__(self):
         self._exemplars.pop(self.__content_hash__())
+        self._global_validators.pop(id(self), None)
+        self._hashes.discard(hash_text(self.text))
+
+        for key in self._text_keys:
+            self._text_index.pop(key, None)
 
         return None
@@ -0,0 +1,53 @@
+"""Update context
+
+Scratch space of single update processing.  Context opened by
+`KeyboardStatesMiddleware` before update processing and closed
+after it, so any code, called by handlers, can use it.
+
+"""
+
+
+from contextvars import ContextVar, Token
+from typing import Optional, Any
+
+from aiogram.dispatcher.webhook import AnswerCallbackQuery
+
+
+class UpdateContext:
+    """Update Context object
+
+    Contains cached data, that lives until update processed.
+    Tasks, spawned by handlers, inherit the context and can
+    outlive the update, so closed context must not be used
+    for caching (see `closed`).
+
+    """
+
+    def __init__(self):
+        self.storage: dict[tuple[str, str], Any] = dict()
+        self.validations: dict[tuple, Any] = dict()
+        self.callback_answer: Optional[AnswerCallbackQuery] = None
+        self.closed = False
+
+
+_current_context: ContextVar[Optional[UpdateContext]] = ContextVar('markups_update_context',
+                                                                    default=None)
+
+
+def current_context() -> Optional[UpdateContext]:
+    """ Get context of processing update or None """
+
+    return _current_context.get()
+
+
+def open_context() -> Token:
+    return _current_context.set(UpdateContext())
+
+
+def close_context(token: Token) -> None:
+    if (context := _current_context.get()) is not None:
+        context.closed = True
+
+    _current_context.reset(token)
+
+    return None
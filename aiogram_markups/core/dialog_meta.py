@@ -1,4 +1,4 @@
-from typing import Union, TYPE_CHECKING, Any
+from typing import Union, TYPE_CHECKING, Any, Optional
 
 from aiogram.types import Message, CallbackQuery, User
 
@@ -30,6 +30,7 @@ class Convertor:
         content = Union[Message, CallbackQuery, str]
 
         from_user = Union[Message, CallbackQuery]
+        locale = Union[Message, CallbackQuery]
 
     @staticmethod
     def chat_id(obj: ConvertAbleAlias.chat_id) -> int:
@@ -106,6 +107,15 @@ class Convertor:
 
         return result
 
+    @staticmethod
+    def locale(obj: ConvertAbleAlias.locale) -> Optional[str]:
+        if isinstance(obj, (Message, CallbackQuery)):
+            result = obj.from_user.language_code if obj.from_user is not None else None
+        else:
+            raise TypeNotExcepted(obj)
+
+        return result
+
     @staticmethod
     def content(obj: ConvertAbleAlias.content) -> str:
         if isinstance(obj, Message):
@@ -142,6 +152,7 @@ class DialogMeta:
 
         self.chat_id = Convertor.chat_id(obj)
         self.from_user = Convertor.from_user(obj)
+        self.locale = Convertor.locale(obj)
         self.active_message_id = Convertor.message_id(obj)
         self.markup_type = Convertor.markup_type(obj)
         self.data = Convertor.data(obj)
@@ -0,0 +1,334 @@
+"""Filters compiler
+
+Filters of buttons and markups are built from small conditions
+(content, scope state, commands, texts, validator).  Instead of
+nested aiogram `AndFilter`/`OrFilter` chains, they are compiled
+to flat `AllOf`/`AnyOf` evaluators:
+
+- constant `BoolFilter` are folded;
+- nested conjunctions and disjunctions are flattened;
+- content checks of buttons are merged to one set membership
+  test, also when buttons have same other conditions (markup
+  filter is `state & content in {...}`, not `state & a | state & b`).
+
+Conditions, that can be checked synchronously, provide method
+`evaluate`, so evaluator does not await them.
+
+Conditions have cost hints (attribute `cost`, see `Cost`), and
+conjunctions are checked cheapest first: content, commands and
+texts, state (storage), validator.  Conditions without hint
+are assumed to be expensive.  If `AllOf.ADAPTIVE` set, conditions
+of same cost are reordered by observed selectivity: the most
+rejecting one goes first.
+
+"""
+
+
+import inspect
+from typing import Any, Callable, Hashable, Iterable, Union, Awaitable, Optional
+
+from aiogram.types import Message, CallbackQuery
+from aiogram.dispatcher.filters.filters import AbstractFilter, AndFilter, OrFilter, Filter
+
+from .dialog_meta import DialogMeta
+from .helpers import Cost
+from .utils import (BoolFilter, CurrentStateFilter, CommandsFilter, TextsFilter, ValidatorFilter,
+                    _validator_key)
+
+
+_UNSET = object()
+
+
+def filter_cost(filter_: Callable) -> int:
+    return getattr(filter_, 'cost', Cost.VALIDATOR)
+
+
+def _evaluator(filter_: Callable) -> Callable[..., Union[Any, Awaitable[Any]]]:
+    if hasattr(filter_, 'evaluate'):
+        return filter_.evaluate
+    if isinstance(filter_, AbstractFilter):
+        return filter_.check
+
+    return filter_
+
+
+class ContentFilter(Filter):
+    """Content filter
+
+    Check if telegram object (or DialogMeta) has content of any
+    of buttons: text (or its localized label) of message or
+    callback data.  Check is set membership.
+
+    """
+
+    cost = Cost.CONTENT
+
+    def __init__(self, buttons: Iterable):
+        self.buttons = tuple(buttons)
+
+        self._normalizer = _UNSET
+        self._texts: frozenset = frozenset()
+        self._callbacks: frozenset = frozenset()
+
+    def _compile(self) -> None:
+        self._normalizer = self.buttons[0].NORMALIZER
+        self._texts = frozenset().union(*(i._text_keys for i in self.buttons))
+        self._callbacks = frozenset(i.inline().callback_data for i in self.buttons)
+
+        return None
+
+    def evaluate(self, obj) -> bool:
+        if not self.buttons:
+            return False
+
+        if self._normalizer is not self.buttons[0].NORMALIZER:
+            self._compile()
+
+        if isinstance(obj, Message):
+            result = self.buttons[0]._text_key(obj.text) in self._texts
+        elif isinstance(obj, CallbackQuery):
+            result = obj.data in self._callbacks
+        elif isinstance(obj, DialogMeta):
+            result = self.buttons[0]._text_key(obj.content) in self._texts
+        else:
+            result = False
+
+        return result
+
+    async def check(self, obj) -> bool:
+        return self.evaluate(obj)
+
+
+class AllOf(Filter):
+    """ All filters must pass, results (dicts) are merged """
+
+    ADAPTIVE = False
+    ADAPTIVE_PERIOD = 1024
+
+    def __init__(self, *filters: Callable):
+        self.filters = list(filters)
+        self._evaluators = [_evaluator(i) for i in self.filters]
+
+        self._checks = 0
+        self._rejections = [0] * len(self.filters)
+
+    @property
+    def cost(self) -> int:
+        return max(map(filter_cost, self.filters), default=Cost.CONSTANT)
+
+    async def check(self, *args):
+        data = {}
+
+        for index, evaluate in enumerate(self._evaluators):
+            result = evaluate(*args)
+
+            if inspect.isawaitable(result):
+                result = await result
+            if not result:
+                if self.ADAPTIVE:
+                    self._observe(index)
+                return False
+            if isinstance(result, dict):
+                data.update(result)
+
+        if self.ADAPTIVE:
+            self._observe(None)
+
+        return data or True
+
+    def _observe(self, rejected: Optional[int]) -> None:
+        self._checks += 1
+
+        if rejected is not None:
+            self._rejections[rejected] += 1
+
+        if self._checks >= self.ADAPTIVE_PERIOD:
+            self._reorder()
+
+        return None
+
+    def _reorder(self) -> None:
+        """Reorder method
+
+        Sort conditions by cost and, within same cost, by number
+        of rejections.  Statistics are halved, so order follows
+        recent traffic.
+
+        """
+
+        order = sorted(range(len(self.filters)),
+                       key=lambda i: (filter_cost(self.filters[i]), -self._rejections[i]))
+
+        self.filters = [self.filters[i] for i in order]
+        self._evaluators = [self._evaluators[i] for i in order]
+        self._rejections = [self._rejections[i] // 2 for i in order]
+        self._checks = 0
+
+        return None
+
+
+class AnyOf(Filter):
+    """ Any filter must pass, result of first one is returned """
+
+    def __init__(self, *filters: Callable):
+        self.filters = list(filters)
+        self._evaluators = [_evaluator(i) for i in self.filters]
+
+    @property
+    def cost(self) -> int:
+        return max(map(filter_cost, self.filters), default=Cost.CONSTANT)
+
+    async def check(self, *args):
+        for evaluate in self._evaluators:
+            result = evaluate(*args)
+
+            if inspect.isawaitable(result):
+                result = await result
+            if result:
+                return result
+
+        return False
+
+
+def filter_key(filter_: Callable) -> Hashable:
+    """Filter key function
+
+    Structural key of condition: equal conditions, built
+    separately (e.g. scope filters of all buttons of markup),
+    have equal keys.
+
+    """
+
+    if isinstance(filter_, BoolFilter):
+        result = (BoolFilter, filter_.boolean)
+    elif isinstance(filter_, CurrentStateFilter):
+        result = (CurrentStateFilter, filter_.state)
+    elif isinstance(filter_, CommandsFilter):
+        result = (CommandsFilter, filter_.commands)
+    elif isinstance(filter_, TextsFilter):
+        result = (TextsFilter, filter_.texts)
+    elif isinstance(filter_, ValidatorFilter):
+        result = (ValidatorFilter, _validator_key(filter_.validator))
+    elif isinstance(filter_, ContentFilter):
+        result = (ContentFilter, filter_.buttons)
+    else:
+        result = filter_
+
+    return result
+
+
+def _targets(filter_: Union[AllOf, AnyOf, AndFilter, OrFilter]) -> list[Callable]:
+    if isinstance(filter_, (AllOf, AnyOf)):
+        return filter_.filters
+
+    return filter_.targets
+
+
+def _compile_all(filter_: Union[AllOf, AndFilter]) -> Callable:
+    parts = []
+
+    for i in _targets(filter_):
+        i = compile_filter(i)
+
+        if isinstance(i, AllOf):
+            parts.extend(i.filters)
+        elif isinstance(i, BoolFilter):
+            if not i.boolean:
+                return BoolFilter(False)
+        else:
+            parts.append(i)
+
+    if not parts:
+        return BoolFilter(True)
+    if len(parts) == 1 and isinstance(parts[0], AbstractFilter):
+        return parts[0]
+
+    parts.sort(key=filter_cost)
+
+    return AllOf(*parts)
+
+
+def _split_content(filter_: Callable) -> tuple[Hashable, Any]:
+    """ Returns key of other conditions and content filter, if branch has one """
+
+    if isinstance(filter_, ContentFilter):
+        return (), filter_
+
+    if isinstance(filter_, AllOf):
+        contents = [i for i in filter_.filters if isinstance(i, ContentFilter)]
+
+        if len(contents) == 1:
+            key = tuple(filter_key(i) for i in filter_.filters if i is not contents[0])
+            return key, contents[0]
+
+    return None, None
+
+
+def _merge_content(filter_: Callable, buttons: list) -> Callable:
+    content = ContentFilter(buttons)
+
+    if isinstance(filter_, ContentFilter):
+        return content
+
+    return AllOf(*[content if isinstance(i, ContentFilter) else i for i in filter_.filters])
+
+
+def _compile_any(filter_: Union[AnyOf, OrFilter]) -> Callable:
+    parts = []
+
+    for i in _targets(filter_):
+        i = compile_filter(i)
+
+        if isinstance(i, AnyOf):
+            parts.extend(i.filters)
+        elif isinstance(i, BoolFilter):
+            if i.boolean:
+                return BoolFilter(True)
+        else:
+            parts.append(i)
+
+    # Branches with same conditions except content are merged
+
+    groups: dict[Hashable, int] = {}
+    buttons: dict[int, list] = {}
+    merged = []
+
+    for i in parts:
+        key, content = _split_content(i)
+
+        if key is None:
+            merged.append(i)
+        elif key in groups:
+            buttons[groups[key]].extend(content.buttons)
+        else:
+            groups[key] = len(merged)
+            buttons[len(merged)] = list(content.buttons)
+            merged.append(i)
+
+    for index, lst in buttons.items():
+        if len(lst) != len(_split_content(merged[index])[1].buttons):
+            merged[index] = _merge_content(merged[index], lst)
+
+    if not merged:
+        return BoolFilter(False)
+    if len(merged) == 1 and isinstance(merged[0], AbstractFilter):
+        return merged[0]
+
+    return AnyOf(*merged)
+
+
+def compile_filter(filter_: Callable) -> Callable:
+    """Compile filter function
+
+    Returns equal flat filter (see module docs).  Filters, that
+    compiler does not know, are kept as is.  Compiled conjunction
+    or disjunction is always aiogram filter.
+
+    """
+
+    if isinstance(filter_, (AllOf, AndFilter)):
+        return _compile_all(filter_)
+    if isinstance(filter_, (AnyOf, OrFilter)):
+        return _compile_any(filter_)
+
+    return filter_
@@ -10,6 +10,16 @@ class Orientation:
     BOTTOM = 1
 
 
+class Cost:
+    """ Cost hints of filter conditions, cheap conditions are checked first """
+
+    CONSTANT = 0
+    CONTENT = 1
+    TEXT = 2
+    STATE = 3
+    VALIDATOR = 4
+
+
 class MarkupScope:
     MESSAGE = 'm'
     CALLBACK_QUERY = 'c'
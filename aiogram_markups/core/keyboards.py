@@ -0,0 +1,145 @@
+"""Reply keyboards store
+
+If store is set, engine remembers digest of last reply keyboard,
+sent to chat, and sends next message with same keyboard without
+`reply_markup` (use `force` of `process` to send it anyway).
+Skipping is disabled by default.
+
+Keyboards of markups are one-time: client hides keyboard, when
+user presses its button.  So digest of chat is forgotten on any
+incoming message of the chat (see middleware), and keyboard is
+skipped only while user has not answered, e.g. if several
+messages are sent in a row or markup is sent on inline press.
+
+Digests are kept per bot and chat: several bots (dispatchers) can
+share one store.
+
+Store is pluggable: `MemoryKeyboardStore` keeps digests in memory,
+for several workers use `StorageKeyboardStore` (or own store) with
+shared storage.
+
+>>> set_keyboard_store(MemoryKeyboardStore())
+>>> set_keyboard_store(StorageKeyboardStore(RedisStorage2()))
+
+Note: keyboards, sent not by markups (e.g. `ReplyKeyboardRemove`),
+are unknown to store.  Call `forget` after sending them.
+
+"""
+
+
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from aiogram.dispatcher.storage import BaseStorage
+from aiogram.types import ReplyKeyboardMarkup
+
+from .utils import TTLCache, hash_text
+
+
+def keyboard_digest(markup: ReplyKeyboardMarkup) -> str:
+    result = hash_text(markup.as_json())
+
+    return result
+
+
+class KeyboardStore(ABC):
+    """Keyboard store object
+
+    Base class of stores of last reply keyboard digests.
+
+    """
+
+    @abstractmethod
+    async def get(self, bot_id: int, chat_id: int) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    async def set(self, bot_id: int, chat_id: int, digest: str) -> None:
+        pass
+
+    @abstractmethod
+    async def forget(self, bot_id: int, chat_id: int) -> None:
+        pass
+
+
+class MemoryKeyboardStore(KeyboardStore):
+    """Memory keyboard store object
+
+    Keeps digests of `maxsize` recent chats for `ttl` seconds.
+
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: Optional[float] = 3600):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, bot_id: int, chat_id: int) -> Optional[str]:
+        return self._cache.get((bot_id, chat_id))
+
+    async def set(self, bot_id: int, chat_id: int, digest: str) -> None:
+        self._cache.set((bot_id, chat_id), digest)
+
+        return None
+
+    async def forget(self, bot_id: int, chat_id: int) -> None:
+        self._cache.pop((bot_id, chat_id))
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+class StorageKeyboardStore(KeyboardStore):
+    """Storage keyboard store object
+
+    Keeps digests in bucket of chat in aiogram storage, so they
+    are shared between workers.  Key of digest contains id of
+    bot, so storage can be shared between bots.
+
+    """
+
+    KEY = 'markups:reply_keyboard'
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    def key(self, bot_id: int) -> str:
+        return f'{self.KEY}:{bot_id}'
+
+    async def get(self, bot_id: int, chat_id: int) -> Optional[str]:
+        bucket = await self.storage.get_bucket(chat=chat_id, user=chat_id)
+        result = (bucket or {}).get(self.key(bot_id))
+
+        return result
+
+    async def set(self, bot_id: int, chat_id: int, digest: str) -> None:
+        await self.storage.update_bucket(chat=chat_id, user=chat_id, **{self.key(bot_id): digest})
+
+        return None
+
+    async def forget(self, bot_id: int, chat_id: int) -> None:
+        await self.storage.update_bucket(chat=chat_id, user=chat_id, **{self.key(bot_id): None})
+
+        return None
+
+
+_store: Optional[KeyboardStore] = None
+
+
+def get_keyboard_store() -> Optional[KeyboardStore]:
+    return _store
+
+
+def set_keyboard_store(store: Optional[KeyboardStore]) -> None:
+    """Set keyboard store function
+
+    Set store of last reply keyboards, to enable skipping of
+    unchanged keyboards.  Pass None to disable it.
+
+    """
+
+    global _store
+
+    _store = store
+
+    return None
@@ -0,0 +1,47 @@
+"""Keyboard limits
+
+Bot API limits of keyboards.  Keyboards over limits are rejected
+by Telegram, so engine checks them before sending.  By default
+(`Overflow.RAISE`) too wide rows and buttons over limit are
+rejected, static buttons of markup are checked on definition.
+With `Overflow.TRUNCATE` too wide rows are wrapped and buttons
+over limit are cut off (keyboard is not paginated), truncated
+keyboards are logged and counted by metric `keyboard.truncated`.
+Callback data of inline keyboards over limit is always rejected.
+
+>>> class Catalog(Markup):
+...     __limits__ = KeyboardLimits(buttons=50, overflow=Overflow.TRUNCATE)
+
+"""
+
+
+class KeyboardLimitExceeded(ValueError):
+    pass
+
+
+class Overflow:
+    TRUNCATE = 'truncate'
+    RAISE = 'raise'
+
+
+class KeyboardLimits:
+    def __init__(self,
+                 row_width: int = 8,
+                 buttons: int = 100,
+                 callback_data: int = 64,
+                 overflow: str = Overflow.RAISE):
+
+        if overflow not in (Overflow.TRUNCATE, Overflow.RAISE):
+            raise ValueError(f'Unknown overflow policy `{overflow}`')
+
+        self.row_width = row_width
+        self.buttons = buttons
+        self.callback_data = callback_data
+        self.overflow = overflow
+
+    def __repr__(self):
+        return (f'<KeyboardLimits row_width={self.row_width} buttons={self.buttons} '
+                f'callback_data={self.callback_data} overflow={self.overflow!r}>')
+
+
+DEFAULT_LIMITS = KeyboardLimits()
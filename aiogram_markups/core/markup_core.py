@@ -1,22 +1,44 @@
-from typing import Callable, overload, Literal, Awaitable, Union, Optional
+import asyncio
+import inspect
+from typing import Callable, overload, Literal, Awaitable, Union, Optional, Hashable, Mapping, Any
 
+from aiogram import Dispatcher
 from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup, Message
 from aiogram.utils.exceptions import MessageCantBeEdited, MessageToEditNotFound
+from aiogram.dispatcher.handler import ctx_data
 
 from ..configuration import get_dp, logger
 
 from .button import Button, DefinitionScope
 from .helpers import MarkupType, Orientation, MarkupScope
 from .dialog_meta import meta_able_alias, DialogMeta
-from .utils import BoolFilter, hash_text
+from .utils import BoolFilter, TTLCache, hash_text, run_validator, run_hook
+from .text import TextTemplate
+from .metrics import metrics
 from .tools.handle import handle
 from .markup_scheme import MarkupScheme, MarkupSchemeButton
+from .filters import AnyOf, ContentFilter, compile_filter
+from .sequencer import ChatSequencer, Slot
+from .keyboards import get_keyboard_store, keyboard_digest
+from .middleware import BUTTON_KEY
+
+
+SEQUENCER = ChatSequencer()
+
+
+def pressed_button() -> Optional[Button]:
+    """ Button, detected by middleware in processing update, or None """
+
+    data = ctx_data.get() or {}
+    result = data.get(BUTTON_KEY)
+
+    return result
 
 
 class MarkupBehavior:
     def __init__(self,
                  handler: Callable[[DialogMeta], Awaitable[None]] = None,
-                 validator: Callable[[DialogMeta], Awaitable[bool]] = None,
+                 validator: Callable[[DialogMeta], Union[bool, Awaitable[bool]]] = None,
                  is_global: bool = False):
 
         self._handler = handler
@@ -27,41 +49,67 @@ class MarkupBehavior:
     def handler(self):
 
         async def new(obj):
-            button = await Button.from_telegram_object(obj)
-
             meta = DialogMeta(obj,
-                              button=button)
+                              button=pressed_button())
 
             if self.validator is not None:
-                if await self.validator(meta):
-                    result = await self._handler(meta)
-                else:
-                    result = None
+                is_valid = run_validator(self.validator, meta)
+
+                if inspect.isawaitable(is_valid):
+                    is_valid = await is_valid
             else:
+                is_valid = True
+
+            if is_valid:
                 result = await self._handler(meta)
+            else:
+                result = None
 
             return result
 
         return new
 
 
+class RenderedMarkup:
+    """ Markup, rendered for chat and ready to be sent """
+
+    def __init__(self,
+                 raw_meta: meta_able_alias,
+                 meta: DialogMeta,
+                 markup_type: str,
+                 text: Optional[str],
+                 reply_markup: Optional[Union[ReplyKeyboardMarkup, InlineKeyboardMarkup]]):
+
+        self.raw_meta = raw_meta
+        self.meta = meta
+        self.markup_type = markup_type
+        self.text = text
+        self.reply_markup = reply_markup
+
+
 class MarkupCore:
     def __init__(self,
                  buttons: list[Button] = None,
-                 text: Union[str, Callable[[DialogMeta], Awaitable[str]]] = None,
+                 text: Union[str, TextTemplate, Callable[[DialogMeta], Awaitable[str]]] = None,
                  orientation: str = Orientation.UNDEFINED,
                  ignore_state: bool = False,
                  width: int = 1,
                  one_time_keyboard: bool = True,
                  definition_scope: DefinitionScope = None,
                  markup_scope: str = None,
-                 markup_scheme: MarkupScheme = None):
+                 markup_scheme: MarkupScheme = None,
+                 text_values: Callable[[DialogMeta], Awaitable[Mapping[str, Any]]] = None,
+                 text_cache: TTLCache = None,
+                 text_cache_key: Callable[[DialogMeta], Optional[Hashable]] = None):
 
         if buttons is None:
             buttons = []
 
         self.buttons = buttons
         self.text = text
+        self.text_values = text_values
+        self.text_cache = text_cache
+        self.text_cache_key = text_cache_key
         self.width = width
         self.one_time_keyboard = one_time_keyboard
         self.markup_scope = markup_scope
@@ -100,11 +148,14 @@ class MarkupCore:
                 content_validator = self.filter(include_scope=False)
 
             async def new_validator(obj):
-                button = await Button.from_telegram_object(obj)
-                obj = DialogMeta(obj, button=button)
+                obj = DialogMeta(obj, button=pressed_button())
 
-                result = (bool(await content_validator(obj))
-                          & bool(await self.definition_scope.filter(obj)))
+                is_valid = run_validator(content_validator, obj)
+
+                if inspect.isawaitable(is_valid):
+                    is_valid = await is_valid
+
+                result = bool(is_valid) and bool(await self.definition_scope.filter(obj))
 
                 return result
 
@@ -145,6 +196,7 @@ class MarkupCore:
                             definition_scope: DefinitionScope = None,
                             is_global: bool = None,
                             validator: Callable[[DialogMeta], Awaitable[bool]] = None,
+                            debounce: float = None,
                             **kwargs) -> None:
 
         ...
@@ -244,18 +296,15 @@ class MarkupCore:
 
         return markup
 
-    async def process(self,
-                      raw_meta: meta_able_alias,
-                      markup_scope: Literal['m', 'c', 'm+c'] = None) -> Message:
-
-        """Process method
+    async def render(self,
+                     raw_meta: meta_able_alias,
+                     markup_scope: Literal['m', 'c', 'm+c'] = None) -> 'RenderedMarkup':
 
-        Process markup in chat, mentioned in `meta` object.
-        MarkupCore scope makes able to hard set keyboard_type.
+        """Render method
 
-        :param raw_meta: meta of chat
-        :param markup_scope: scope of markup processing
-        :returns: Message object
+        Prepare text and keyboard of markup for chat, mentioned in
+        `meta` object, without sending.  Renders are independent,
+        so can be run concurrently.
 
         """
 
@@ -276,43 +325,141 @@ class MarkupCore:
         if markup_type == MarkupType.UNDEFINED:
             markup_type = MarkupType.TEXT
 
-        logger.debug(f"Processing `{self.definition_scope.state}` at {meta.chat_id}:{meta.from_user.id}")
+        text = await self.render_text(meta)
+        reply_markup = await self.get_markup(meta, markup_type)
 
-        if isinstance(self.text, str):
-            text = self.text
-        else:
-            text = await self.text(meta)
+        result = RenderedMarkup(raw_meta, meta, markup_type, text, reply_markup)
 
-        reply_markup = await self.get_markup(meta, markup_type)
+        return result
 
-        dp = get_dp()
+    async def send(self,
+                   rendered: 'RenderedMarkup',
+                   force: bool = False,
+                   dp: Dispatcher = None) -> Optional[Message]:
+        """Send method
+
+        Send rendered markup by bot of dispatcher (by default,
+        of dispatcher, that processes update) and set state of
+        markup.  Reply keyboard, that is already open in chat, is
+        not sent again, unless `force` (if markup has no text,
+        nothing is sent).
+
+        """
+
+        meta = rendered.meta
+        markup_type = rendered.markup_type
+
+        logger.debug(f"Processing `{self.definition_scope.state}` at {meta.chat_id}:{meta.from_user.id}")
+
+        if dp is None:
+            dp = get_dp()
 
         if markup_type == MarkupType.TEXT:
-            response = await dp.bot.send_message(chat_id=meta.chat_id,
-                                                 text=text,
-                                                 reply_markup=reply_markup)
+            store = get_keyboard_store()
+            reply_markup = rendered.reply_markup
+            digest = None
+
+            if store is not None and reply_markup is not None:
+                digest = keyboard_digest(reply_markup)
+
+                if not force and await store.get(dp.bot.id, meta.chat_id) == digest:
+                    metrics.increment('keyboard.skip')
+                    reply_markup = None
+
+            if reply_markup is not None or rendered.text is not None:
+                response = await dp.bot.send_message(chat_id=meta.chat_id,
+                                                     text=rendered.text,
+                                                     reply_markup=reply_markup)
+            else:
+                response = None
+
+            if reply_markup is not None and digest is not None:
+                await store.set(dp.bot.id, meta.chat_id, digest)
 
         elif markup_type == MarkupType.INLINE:
             try:
                 response = await dp.bot.edit_message_text(chat_id=meta.chat_id,
-                                                          text=text,
-                                                          reply_markup=reply_markup,
+                                                          text=rendered.text,
+                                                          reply_markup=rendered.reply_markup,
                                                           message_id=meta.active_message_id)
 
             except (MessageCantBeEdited, MessageToEditNotFound):
                 response = await dp.bot.send_message(chat_id=meta.chat_id,
-                                                     text=text,
-                                                     reply_markup=reply_markup)
+                                                     text=rendered.text,
+                                                     reply_markup=rendered.reply_markup)
 
         else:
             raise KeyError(f"Can't process markup with type {markup_type}")
 
         # Prepare to markup handle
 
-        await self.definition_scope.set_state(raw_meta)
+        await self.definition_scope.set_state(rendered.raw_meta, dp)
 
         return response
 
+    async def process(self,
+                      raw_meta: meta_able_alias,
+                      markup_scope: Literal['m', 'c', 'm+c'] = None,
+                      force: bool = False,
+                      dp: Dispatcher = None) -> Optional[Message]:
+
+        """Process method
+
+        Process markup in chat, mentioned in `meta` object.
+        MarkupCore scope makes able to hard set keyboard_type.
+
+        :param raw_meta: meta of chat
+        :param markup_scope: scope of markup processing
+        :param force: send reply keyboard, even if it is open in chat
+        :param dp: dispatcher, whose bot sends markup (by default,
+            dispatcher, that processes update, see `get_dp`)
+        :returns: Message object
+
+        """
+
+        if dp is None:
+            dp = get_dp()
+
+        rendered = await self.render(raw_meta, markup_scope)
+
+        async with SEQUENCER.reserve((dp.bot.id, rendered.meta.chat_id)):
+            result = await self.send(rendered, force, dp)
+
+        return result
+
+    async def render_text(self, meta: DialogMeta) -> Optional[str]:
+        """Render text method
+
+        Text can be str, template, coroutine function or blocking
+        function (see `blocking`).  Result of function is cached,
+        if cache and key provided.
+
+        """
+
+        if isinstance(self.text, str) or self.text is None:
+            return self.text
+
+        if isinstance(self.text, TextTemplate):
+            values = await run_hook(self.text_values, meta) if self.text_values is not None else {}
+            return self.text.format(meta=meta, **values)
+
+        key = None
+
+        if self.text_cache is not None and self.text_cache_key is not None:
+            key = self.text_cache_key(meta)
+
+        if key is not None and (text := self.text_cache.get(key)) is not None:
+            metrics.increment('text.cache.hit')
+            return text
+
+        text = await run_hook(self.text, meta)
+
+        if key is not None:
+            metrics.increment('text.cache.miss')
+            self.text_cache.set(key, text)
+
+        return text
+
     def filter(self, include_scope: bool = True):
         """Filter for KeyBoard
 
@@ -321,13 +468,10 @@ class MarkupCore:
 
         """
 
-        result = BoolFilter(False)
-
-        for i in self.buttons:
-            if include_scope:
-                result = result.__or__(i.filter())
-            else:
-                result = result.__or__(i.check_content)
+        if include_scope:
+            result = compile_filter(AnyOf(*[i.filter() for i in self.buttons]))
+        else:
+            result = compile_filter(AnyOf(ContentFilter(self.buttons)))
 
         return result
 
@@ -353,3 +497,53 @@ class MarkupCore:
     def extend(self, objects: list[Button]):
         self.buttons.extend(objects)
         self.synchronize_buttons(definition_scope=self.definition_scope)
+
+
+async def process_ordered(cores: list[MarkupCore],
+                          raw_meta: meta_able_alias,
+                          dp: Dispatcher = None) -> list[Optional[Message]]:
+
+    """Process ordered function
+
+    Process several markups in one chat: markups are rendered
+    concurrently, and sent in order of list.  If markup fails
+    (on render or sending), markups after it are not sent, and
+    error is raised, when markups before it are done.
+
+    """
+
+    if dp is None:
+        dp = get_dp()
+
+    key = (dp.bot.id, DialogMeta(raw_meta).chat_id)
+    slots = [SEQUENCER.reserve(key) for _ in cores]
+    failed_at: Optional[int] = None
+
+    async def run(index: int, core: MarkupCore, slot: Slot) -> Optional[Message]:
+        nonlocal failed_at
+
+        try:
+            rendered = await core.render(raw_meta)
+            await slot.wait()
+
+            if failed_at is not None and failed_at < index:
+                return None
+
+            return await core.send(rendered, dp=dp)
+
+        except Exception:
+            if failed_at is None or index < failed_at:
+                failed_at = index
+            raise
+
+        finally:
+            slot.release()
+
+    result = await asyncio.gather(*[run(index, core, slot)
+                                    for index, (core, slot) in enumerate(zip(cores, slots))],
+                                  return_exceptions=True)
+
+    if failed_at is not None:
+        raise result[failed_at]
+
+    return list(result)
@@ -1,10 +1,16 @@
-from typing import overload, Callable, Awaitable, Optional, Union
+import inspect
+from typing import overload, Callable, Awaitable, Optional, Union, Hashable, Iterable
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 
 from .dialog_meta import DialogMeta
 from .button import Button
 from .helpers import MarkupType
+from .utils import TTLCache, run_hook, run_blocking, is_blocking
+from .metrics import metrics
+from .limits import KeyboardLimits, KeyboardLimitExceeded, Overflow, DEFAULT_LIMITS
+
+from ..configuration import logger
 
 
 class MarkupSchemeButton:
@@ -38,6 +44,15 @@ class MarkupSchemeButton:
         self.callback_data = callback_data
         self.url = url
         self.row_width = row_width
+        self.button = button
+
+    def label(self, locale: Optional[str] = None) -> str:
+        """ Get text for locale, if button has localized labels """
+
+        if self.button is not None and self.button.labels:
+            return self.button.label(locale)
+
+        return self.text
 
 
 class MarkupConstructor:
@@ -64,26 +79,212 @@ class MarkupConstructor:
         self.rows[row].pop(col)
 
 
+class RowsCollector:
+    """Rows collector
+
+    Collect rows of keyboard within limits.  Rows are added one
+    by one, so producer of rows can be stopped, when keyboard
+    is full.
+
+    Keyboard is not paginated: with `Overflow.TRUNCATE` buttons
+    over limit are dropped (and producer of rows is stopped).
+    Truncation is logged and counted by metric `keyboard.truncated`,
+    full keyboard without dropped buttons is not truncated.
+
+    """
+
+    def __init__(self, limits: KeyboardLimits):
+        self.limits = limits
+        self.rows: list[list[MarkupSchemeButton]] = []
+        self.count = 0
+        self.truncated = False
+
+    def _overflow(self, message: str) -> None:
+        if self.limits.overflow == Overflow.RAISE:
+            raise KeyboardLimitExceeded(message)
+
+        return None
+
+    def truncate(self) -> None:
+        """Truncate method
+
+        Mark keyboard as truncated: rows over limit are dropped
+        or not produced.
+
+        """
+
+        if self.truncated:
+            return None
+
+        self.truncated = True
+        metrics.increment('keyboard.truncated')
+        logger.warning(f'Keyboard is truncated to {self.limits.buttons} buttons')
+
+        return None
+
+    def add(self, row: Iterable[Union[MarkupSchemeButton, Button]]) -> bool:
+        """Add method
+
+        Add row, returns False, if keyboard is truncated and no
+        more rows must be added.
+
+        """
+
+        row = [MarkupSchemeButton(button=i) if isinstance(i, Button) else i for i in row]
+
+        for i in row:
+            if i.text is None or not str(i.text).strip():
+                raise KeyboardLimitExceeded(f'Button with callback data `{i.callback_data}` has empty text')
+
+        width = self.limits.row_width
+
+        if len(row) > width:
+            self._overflow(f'Row of {len(row)} buttons is wider than {width}')
+
+        for start in range(0, len(row), width):
+            chunk = row[start:start + width]
+            free = self.limits.buttons - self.count
+
+            if len(chunk) > free:
+                self._overflow(f'Keyboard has more than {self.limits.buttons} buttons')
+                self.truncate()
+                chunk = chunk[:free]
+
+            if chunk:
+                self.rows.append(chunk)
+                self.count += len(chunk)
+
+            if self.truncated:
+                return False
+
+        return True
+
+
 class MarkupScheme:
+    """Markup Scheme object
+
+    Apply runtime construct to markup rows.  If cache and
+    cache key function provided, constructed rows are reused
+    for identical keys (key None means "do not cache").
+
+    Construct can be (sync or async) generator of rows: rows
+    are appended to markup rows and consumed until keyboard
+    limits are reached.
+
+    """
+
+    _MISSING = object()
+    _END = object()
+
     def __init__(self,
                  construct: Callable[[DialogMeta, MarkupConstructor],
-                                     Awaitable[Optional[bool]]] = None):
+                                     Awaitable[Optional[bool]]] = None,
+                 cache: TTLCache = None,
+                 cache_key: Callable[[DialogMeta], Optional[Hashable]] = None,
+                 limits: KeyboardLimits = None):
 
         self.construct = construct
+        self.cache = cache
+        self.cache_key = cache_key
+        self.limits = limits or DEFAULT_LIMITS
+
+    def fit_rows(self, rows: list[list[MarkupSchemeButton]]) -> list[list[MarkupSchemeButton]]:
+        """ Check rows against limits before sending """
+
+        collector = RowsCollector(self.limits)
+
+        for row in rows:
+            if not collector.add(row):
+                break
+
+        return collector.rows
+
+    def check_callback_data(self, button: MarkupSchemeButton) -> None:
+        """ Check callback data of inline button (reply keyboards send no data) """
+
+        limit = self.limits.callback_data
+
+        if limit is not None and button.callback_data is not None and len(button.callback_data.encode()) > limit:
+            raise KeyboardLimitExceeded(f'Callback data `{button.callback_data}` of button `{button.text}` '
+                                        f'is longer than {limit} bytes')
+
+        return None
+
+    async def collect_rows(self, constructor: MarkupConstructor, rows_generator) -> list[list[MarkupSchemeButton]]:
+        """Collect rows method
+
+        Consume generator of rows until keyboard is truncated (first
+        row over limit is dropped and generator is stopped).  Generator
+        is closed in any case, even if limit is exceeded with
+        `Overflow.RAISE`.  Rows of blocking generator are produced
+        in executor.
+
+        """
+
+        collector = RowsCollector(self.limits)
+
+        if inspect.isasyncgen(rows_generator):
+            try:
+                if all(collector.add(i) for i in constructor.rows):
+                    async for row in rows_generator:
+                        if not collector.add(row):
+                            break
+            finally:
+                await rows_generator.aclose()
+
+        else:
+            try:
+                is_truncated = not all(collector.add(i) for i in constructor.rows)
+
+                while not is_truncated:
+                    if is_blocking(self.construct):
+                        row = await run_blocking(next, rows_generator, self._END)
+                    else:
+                        row = next(rows_generator, self._END)
+
+                    if row is self._END:
+                        break
+
+                    is_truncated = not collector.add(row)
+            finally:
+                rows_generator.close()
+
+        return collector.rows
 
     async def apply_construct(self,
                               meta: DialogMeta,
                               rows: list[list[MarkupSchemeButton]]
                               ) -> Optional[list[list[MarkupSchemeButton]]]:
 
-        if self.construct is not None:
-            constructor = MarkupConstructor(rows.copy())
-            is_actual = await self.construct(meta, constructor)
+        if self.construct is None:
+            return self.fit_rows(rows)
 
-            if is_actual is False:
-                return None
-            else:
-                rows = constructor.rows
+        key = None
+
+        if self.cache is not None and self.cache_key is not None:
+            key = self.cache_key(meta)
+
+        if key is not None:
+            cached = self.cache.get(key, self._MISSING)
+
+            if cached is not self._MISSING:
+                metrics.increment('construct.cache.hit')
+                return cached
+
+            metrics.increment('construct.cache.miss')
+
+        constructor = MarkupConstructor(rows.copy())
+        is_actual = await run_hook(self.construct, meta, constructor)
+
+        if inspect.isgenerator(is_actual) or inspect.isasyncgen(is_actual):
+            rows = await self.collect_rows(constructor, is_actual)
+        elif is_actual is False:
+            rows = None
+        else:
+            rows = self.fit_rows(constructor.rows)
+
+        if key is not None:
+            self.cache.set(key, rows)
 
         return rows
 
@@ -107,11 +308,14 @@ class MarkupScheme:
 
         for i in rows:
             if markup_type == MarkupType.TEXT:
-                markup.row(*[KeyboardButton(j.text)
+                markup.row(*[KeyboardButton(j.label(meta.locale))
                              for j in i])
 
             elif markup_type == MarkupType.INLINE:
-                markup.row(*[InlineKeyboardButton(j.text,
+                for j in i:
+                    self.check_callback_data(j)
+
+                markup.row(*[InlineKeyboardButton(j.label(meta.locale),
                                                   callback_data=j.callback_data,
                                                   url=j.url)
 
@@ -0,0 +1,150 @@
+"""Metrics
+
+In-process instrumentation of markups engine.  Counters are
+incremented by engine, read them or export to your monitoring
+system via `metrics.counters`.  Timings (seconds) of recent
+events are kept in `metrics.timings`.
+
+Event loop lag (how late loop wakes up sleeping task, so how
+long loop is blocked) is observed as `loop.lag` by `LoopLagMonitor`.
+Dispatchers share one monitor per event loop (see `acquire`), it
+is stopped, when the last of them is shut down.
+
+"""
+
+
+import asyncio
+import time
+import weakref
+from collections import defaultdict, deque
+from typing import Optional
+
+
+class Metrics:
+    """Metrics object
+
+    Named counters of engine events and bounded samples
+    of named timings.
+
+    """
+
+    MAX_SAMPLES = 10000
+
+    def __init__(self):
+        self.counters: dict[str, int] = defaultdict(int)
+        self.timings: dict[str, deque[float]] = defaultdict(lambda: deque(maxlen=self.MAX_SAMPLES))
+
+    def increment(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+        return None
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.timings[name].append(seconds)
+
+        return None
+
+    def percentile(self, name: str, q: float) -> Optional[float]:
+        """Percentile method
+
+        Returns q-th (0..100) percentile of timing samples,
+        or None if no samples.
+
+        """
+
+        samples = sorted(self.timings.get(name, ()))
+
+        if not samples:
+            return None
+
+        index = min(len(samples) - 1, int(len(samples) * q / 100))
+        result = samples[index]
+
+        return result
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.timings.clear()
+
+        return None
+
+
+metrics = Metrics()
+
+
+class LoopLagMonitor:
+    """Loop lag monitor
+
+    Task, that sleeps for `interval` seconds and observes,
+    how late it wakes up.
+
+    """
+
+    _SHARED: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LoopLagMonitor]' = weakref.WeakKeyDictionary()
+
+    def __init__(self, interval: float = 0.5, target: Metrics = metrics):
+        self.interval = interval
+        self.target = target
+        self.users = 0
+
+        self._task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def acquire(cls, interval: float) -> 'LoopLagMonitor':
+        """Acquire method
+
+        Returns running monitor of current event loop (interval
+        of the first user is kept), starts it, if there is none.
+        Call `release`, when monitor is not needed.
+
+        """
+
+        loop = asyncio.get_running_loop()
+        monitor = cls._SHARED.get(loop)
+
+        if monitor is None or not monitor.is_running:
+            monitor = cls._SHARED[loop] = cls(interval)
+            monitor.start()
+
+        monitor.users += 1
+
+        return monitor
+
+    def release(self) -> None:
+        """ Release method, stops monitor, when it has no users """
+
+        self.users -= 1
+
+        if self.users <= 0:
+            self.stop()
+
+            for loop, monitor in list(self._SHARED.items()):
+                if monitor is self:
+                    del self._SHARED[loop]
+
+        return None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if not self.is_running:
+            self._task = asyncio.ensure_future(self._run())
+
+        return None
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        return None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - start - self.interval
+
+            self.target.observe('loop.lag', max(lag, 0.0))
@@ -7,68 +7,258 @@ refresh current state. Same if sent appropriate callback_query.
 Also, if button have .data (is not None), message.text or call.data
 replacing on it's value. It represented by process_ middlewares.
 
+Button is detected once, on pre_process_, and passed to process_
+(and handlers, as `markup_button` argument) via handler data.
+Updates with content of no button (and no global validators
+defined) are passed at once, without search.
+Callback answer is sent concurrently with update processing.
+
+Presses of buttons with `debounce` window are remembered: repeated
+press of same button in same message (same text in chat, for text
+buttons) within the window is answered and dropped.
+
+Callback queries of buttons can be answered automatically
+(`answer_callbacks`): 'auto' answers concurrently, 'webhook'
+returns answer in webhook response (if handlers return no other
+response), so no request to Bot API is made.  Under polling there
+is no webhook response, so 'webhook' answers as 'auto'.
+
+If keyboard store is set (see `keyboards`), digest of last reply
+keyboard of chat is forgotten on any message of chat: one-time
+keyboard is hidden, when user presses its button.
+
+If loop lag interval set, loop lag is monitored (see `metrics`)
+since first update, until dispatcher is shut down (see
+`shutdown_aiogram_keyboards`).
+
+Each update is processed within update context (see `context`),
+opened on pre_process_update.  If dispatcher storage is buffered,
+its changes are flushed on post_process_update.
+
+If dispatcher has scheduler, update is processed within slot of its
+chat: slot is taken on process_update, before filters and state
+reads of message and callback handlers, and released on
+post_process_update (always called after process_update), after
+storage flush.
+
 """
 
 
+import asyncio
+import itertools
+from typing import Awaitable, Hashable, Optional, Literal
+
 from aiogram import Dispatcher
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, Update
+from aiogram.dispatcher.handler import CancelHandler
 from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.dispatcher.webhook import AnswerCallbackQuery, BaseResponse
 
 from .button import Button
 from .dialog_meta import DialogMeta
+from .context import open_context, close_context, current_context
+from .storage import BufferedStorage
+from .keyboards import get_keyboard_store
+from .utils import TTLCache
+from .metrics import metrics, LoopLagMonitor
+
+from ..configuration import logger, SCHEDULERS
+
 
-from ..configuration import logger
+BUTTON_KEY = 'markup_button'
 
 
 class KeyboardStatesMiddleware(BaseMiddleware):
-    def __init__(self, dp: Dispatcher):
+    def __init__(self,
+                 dp: Dispatcher,
+                 debounce_size: int = 4096,
+                 answer_callbacks: Literal['auto', 'webhook'] = None,
+                 loop_lag_interval: float = None):
+
+        if answer_callbacks not in (None, 'auto', 'webhook'):
+            raise ValueError(f'Unknown callbacks answer mode `{answer_callbacks}`')
+
         self.dp = dp
+        self.answer_callbacks = answer_callbacks
+        self._tasks: set[asyncio.Task] = set()
+        self._presses = TTLCache(maxsize=debounce_size)
+        self.loop_lag_interval = loop_lag_interval
+        self._monitor: Optional[LoopLagMonitor] = None
 
         super().__init__()
 
-    async def on_pre_process_message(self, message: Message, *_args):
-        if message.text is None:
+    async def on_pre_process_update(self, update: Update, data: dict):
+        if self.loop_lag_interval and self._monitor is None:
+            self._monitor = LoopLagMonitor.acquire(self.loop_lag_interval)
+
+        data['_markups_context'] = open_context()
+
+    async def on_process_update(self, update: Update, data: dict):
+        if '_markups_ticket' in data:  # several update handlers
+            return None
+
+        if (scheduler := SCHEDULERS.get(self.dp)) is not None:
+            if (key := scheduler.update_key(update)) is not None:
+                data['_markups_ticket'] = await scheduler.acquire(key)
+
+    async def on_post_process_update(self, _update: Update, results: list, data: dict):
+        token = data.pop('_markups_context')
+        ticket = data.pop('_markups_ticket', None)
+
+        try:
+            if (answer := current_context().callback_answer) is not None:
+                self._respond(answer, results)
+
+            if isinstance(self.dp.storage, BufferedStorage):
+                await self.dp.storage.flush()
+        finally:
+            close_context(token)
+
+            if ticket is not None:
+                ticket.release()
+
+    async def on_pre_process_message(self, message: Message, data: dict):
+        if (store := get_keyboard_store()) is not None:
+            await store.forget(self.dp.bot.id, message.chat.id)
+
+        if message.text is None or not Button.is_known(message):
             return None
 
         if (button := await Button.from_telegram_object(message)) is None:
             return None
-        else:
-            meta = DialogMeta(message)
-            logger.debug(f'Detected button `{button}` press at {meta.chat_id}:{meta.from_user.id}')
 
-            if button.ignore_state:
-                state = self.dp.current_state(chat=message.chat.id, user=message.from_user.id)
-                await state.reset_state()
+        meta = DialogMeta(message)
+
+        if self.is_duplicate(button, (meta.chat_id, message.text)):
+            raise CancelHandler()
+
+        data[BUTTON_KEY] = button
+
+        logger.debug(f'Detected button `{button}` press at {meta.chat_id}:{meta.from_user.id}')
+
+        if button.ignore_state:
+            state = self.dp.current_state(chat=message.chat.id, user=message.from_user.id)
+            await state.reset_state()
+
+    async def on_pre_process_callback_query(self, call: CallbackQuery, data: dict):
+        if not Button.is_known(call):
+            return None
 
-    async def on_pre_process_callback_query(self, call: CallbackQuery, *_args):
         if (button := await Button.from_telegram_object(call)) is None:
             return None
-        else:
-            meta = DialogMeta(call)
-            logger.debug(f'Detected button `{button}` press at {meta.chat_id}:{meta.from_user.id}')
+
+        meta = DialogMeta(call)
+
+        if self.is_duplicate(button, (meta.chat_id, meta.active_message_id, call.data)):
+            self.answer(call, button.on_callback)
+            raise CancelHandler()
+
+        data[BUTTON_KEY] = button
+
+        logger.debug(f'Detected button `{button}` press at {meta.chat_id}:{meta.from_user.id}')
+
+        if button.on_callback is not None or self.answer_callbacks is not None:
+            self.answer(call, button.on_callback)
 
         if button.ignore_state:
             state = self.dp.current_state(chat=call.message.chat.id, user=call.from_user.id)
             await state.reset_state()
 
-        if button.on_callback is not None:
-            await call.answer(button.on_callback)
-
     @staticmethod
-    async def on_process_message(message: Message, *_args):
-        if message.text is None:
-            return None
-
-        if (button := await Button.from_telegram_object(message)) is None:
+    async def on_process_message(message: Message, data: dict):
+        if (button := data.get(BUTTON_KEY)) is None:
             return None
 
         if button.data is not None:
             message.text = button.data
 
     @staticmethod
-    async def on_process_callback_query(call: CallbackQuery, *_args):
-        if (button := await Button.from_telegram_object(call)) is None:
+    async def on_process_callback_query(call: CallbackQuery, data: dict):
+        if (button := data.get(BUTTON_KEY)) is None:
             return None
 
         if button.data is not None:
             call.data = button.data
+
+    def close(self) -> None:
+        """ Close method, release loop lag monitor """
+
+        if self._monitor is not None:
+            self._monitor.release()
+            self._monitor = None
+
+        return None
+
+    def is_duplicate(self, button: Button, key: Hashable) -> bool:
+        """Is duplicate method
+
+        Check if press is repeated within debounce window
+        of button, and remember it otherwise.
+
+        """
+
+        window: Optional[float] = button.debounce
+
+        if not window:
+            return False
+
+        if key in self._presses:
+            metrics.increment('debounce.dropped')
+            return True
+
+        self._presses.set(key, True, ttl=window)
+
+        return False
+
+    def answer(self, call: CallbackQuery, text: str = None) -> None:
+        """Answer method
+
+        Answer callback query: concurrently with update processing
+        or, in webhook mode, by response to webhook request (if
+        dispatcher is not polling).
+
+        """
+
+        context = current_context()
+
+        if self.answer_callbacks == 'webhook' and context is not None and not self.dp.is_polling():
+            context.callback_answer = AnswerCallbackQuery(call.id, text)
+        else:
+            self.spawn(self.dp.bot.answer_callback_query(call.id, text))
+
+        return None
+
+    def _respond(self, answer: AnswerCallbackQuery, results: list) -> None:
+        """Respond method
+
+        Add answer to update results, so webhook returns it.  Only one
+        response allowed, so if handlers responded, answer is sent.
+
+        """
+
+        if any(isinstance(i, BaseResponse) for i in itertools.chain.from_iterable(results)):
+            self.spawn(answer.execute_response(self.dp.bot))
+        else:
+            results.append([answer])
+
+        return None
+
+    def spawn(self, coro: Awaitable) -> asyncio.Task:
+        """Spawn method
+
+        Run coroutine concurrently with update processing.
+        Task is referenced until done, errors are logged.
+
+        """
+
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+        return task
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            logger.opt(exception=task.exception()).error('Background task of keyboards middleware failed')
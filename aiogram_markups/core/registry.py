@@ -0,0 +1,58 @@
+"""Markups registry
+
+States of markups are registered in `StateRegistry`, that
+guarantee unique state names.
+
+"""
+
+
+from typing import Any, Iterator
+
+
+class StateCollision(ValueError):
+    def __init__(self, state: str, owner: Any, other: Any):
+        msg = (f'State `{state}` of `{other}` already registered by `{owner}`. '
+               f'Rename one of them or set `__state__` explicitly')
+
+        super().__init__(msg)
+
+
+class StateRegistry:
+    """State registry object
+
+    Map state names to its owners.  Shared states (defined
+    explicitly, without owner) can be registered any times,
+    but an owned state belongs only to one owner.
+
+    >>> states = StateRegistry()
+    >>> states.register('menu.MainMenu', owner='MainMenu')
+    'menu.MainMenu'
+
+    """
+
+    _MISSING = object()
+
+    def __init__(self):
+        self._owners: dict[str, Any] = dict()
+
+    def register(self, state: str, owner: Any = None) -> str:
+        current = self._owners.get(state, self._MISSING)
+
+        if current is self._MISSING:
+            self._owners[state] = owner
+        elif current is not owner:
+            raise StateCollision(state, current, owner)
+
+        return state
+
+    def owner(self, state: str) -> Any:
+        return self._owners[state]
+
+    def __contains__(self, state: str) -> bool:
+        return state in self._owners
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._owners)
+
+    def __len__(self) -> int:
+        return len(self._owners)
@@ -0,0 +1,160 @@
+"""Chat scheduler
+
+Runs updates with limited concurrency: at most `per_chat` updates
+of one chat at a time and at most `max_concurrency` updates in
+total.  Updates over limits wait for free slot (backpressure), so
+double taps of button are processed one after another, not
+concurrently.
+
+Slot is taken by middleware before update processing and released
+after it (and after buffered storage flush), so filters and state
+reads of next update of chat see changes of previous one.
+
+>>> setup_aiogram_keyboards(dp, scheduler=ChatScheduler(per_chat=1, max_concurrency=64))
+
+"""
+
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Hashable, Optional, Callable, Union
+
+from aiogram.types import Message, CallbackQuery, Update
+
+from .metrics import metrics
+
+
+class _ChatEntry:
+    __slots__ = ('semaphore', 'users')
+
+    def __init__(self, semaphore: asyncio.Semaphore):
+        self.semaphore = semaphore
+        self.users = 0
+
+
+class Ticket:
+    """Ticket object
+
+    Taken slot of scheduler.  Release is idempotent.
+
+    """
+
+    __slots__ = ('_release',)
+
+    def __init__(self, release: Callable[[], None]):
+        self._release: Optional[Callable[[], None]] = release
+
+    def release(self) -> None:
+        if self._release is not None:
+            release, self._release = self._release, None
+            release()
+
+        return None
+
+
+class ChatScheduler:
+    def __init__(self, per_chat: int = 1, max_concurrency: int = 100):
+        if per_chat < 1 or max_concurrency < 1:
+            raise ValueError('Scheduler limits must be positive')
+
+        self.per_chat = per_chat
+        self.max_concurrency = max_concurrency
+
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._chats: dict[Hashable, _ChatEntry] = {}
+
+    @staticmethod
+    def chat_key(obj: Union[Message, CallbackQuery]) -> Optional[Hashable]:
+        """Chat key method
+
+        Returns chat id of telegram object.  Callback queries of
+        inline messages have no chat, they are keyed by user.
+
+        """
+
+        if isinstance(obj, Message):
+            result = obj.chat.id
+        elif isinstance(obj, CallbackQuery):
+            if obj.message is not None:
+                result = obj.message.chat.id
+            else:
+                result = ('user', obj.from_user.id)
+        else:
+            result = None
+
+        return result
+
+    @staticmethod
+    def update_key(update: Update) -> Optional[Hashable]:
+        """ Returns chat key of update, None for updates without chat """
+
+        obj = update.message or update.edited_message or update.callback_query
+
+        if obj is None:
+            return None
+
+        result = ChatScheduler.chat_key(obj)
+
+        return result
+
+    async def acquire(self, key: Hashable) -> Ticket:
+        """Acquire method
+
+        Wait for free slot of chat, then for global one.
+
+        """
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        entry = self._chats.get(key)
+
+        if entry is None:
+            entry = self._chats[key] = _ChatEntry(asyncio.Semaphore(self.per_chat))
+
+        entry.users += 1
+
+        if entry.semaphore.locked() or self._semaphore.locked():
+            metrics.increment('scheduler.wait')
+
+        try:
+            await entry.semaphore.acquire()
+
+            try:
+                await self._semaphore.acquire()
+            except BaseException:
+                entry.semaphore.release()
+                raise
+
+        except BaseException:
+            self._leave(key, entry)
+            raise
+
+        def release():
+            self._semaphore.release()
+            entry.semaphore.release()
+            self._leave(key, entry)
+
+        return Ticket(release)
+
+    def _leave(self, key: Hashable, entry: _ChatEntry) -> None:
+        entry.users -= 1
+
+        if entry.users == 0:
+            del self._chats[key]
+
+        return None
+
+    @asynccontextmanager
+    async def slot(self, key: Hashable):
+        """ Slot method, context manager of `acquire` """
+
+        ticket = await self.acquire(key)
+
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def __len__(self):
+        return len(self._chats)
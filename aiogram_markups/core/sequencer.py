@@ -0,0 +1,100 @@
+"""Chat sequencer
+
+Keeps order of sends to one chat, while preparation of
+messages runs concurrently.  Slot is reserved synchronously,
+in order of calls, and entered when all previous slots of
+this chat are released.
+
+>>> slots = [sequencer.reserve(chat_id) for _ in markups]
+>>> async def run(markup, slot):
+...     message = await render(markup)  # concurrently
+...     async with slot:  # in order of reservation
+...         await send(message)
+
+"""
+
+
+import asyncio
+from typing import Hashable, Optional
+
+
+class Slot:
+    """ Reserved place in chat queue """
+
+    def __init__(self,
+                 sequencer: 'ChatSequencer',
+                 key: Hashable,
+                 previous: Optional[asyncio.Future],
+                 done: asyncio.Future):
+
+        self._sequencer = sequencer
+        self._key = key
+        self._previous = previous
+        self._done = done
+
+    async def wait(self) -> None:
+        if self._previous is not None:
+            await self._previous
+
+        return None
+
+    def release(self) -> None:
+        """Release method
+
+        Let next slot to be entered.  Must be called even if slot
+        was not entered (on errors), can be called several times.
+        Slot, released before previous ones, is finished after them.
+
+        """
+
+        if self._previous is None or self._previous.done():
+            self._finish()
+        else:
+            self._previous.add_done_callback(lambda _: self._finish())
+
+        return None
+
+    def _finish(self) -> None:
+        if not self._done.done():
+            self._done.set_result(None)
+
+        self._sequencer._forget(self._key, self._done)
+
+        return None
+
+    async def __aenter__(self):
+        await self.wait()
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class ChatSequencer:
+    def __init__(self):
+        self._tails: dict[Hashable, asyncio.Future] = {}
+
+    def reserve(self, key: Hashable) -> Slot:
+        """Reserve method
+
+        Get slot after all slots, reserved for this key before.
+
+        """
+
+        previous = self._tails.get(key)
+        done = asyncio.get_event_loop().create_future()
+        self._tails[key] = done
+
+        result = Slot(self, key, previous, done)
+
+        return result
+
+    def _forget(self, key: Hashable, done: asyncio.Future) -> None:
+        if self._tails.get(key) is done:
+            del self._tails[key]
+
+        return None
+
+    def __len__(self):
+        return len(self._tails)
@@ -0,0 +1,204 @@
+import asyncio
+import copy
+import typing
+from typing import Optional
+
+from aiogram.dispatcher.storage import BaseStorage
+
+from .context import current_context
+
+
+class _Record:
+    __slots__ = ('chat', 'user', 'state', 'data', 'updates', 'dirty')
+
+    _NOT_LOADED = object()
+
+    def __init__(self, chat, user):
+        self.chat = chat
+        self.user = user
+        self.state = self._NOT_LOADED
+        self.data = self._NOT_LOADED
+        self.updates: dict = {}
+        self.dirty: set[str] = set()
+
+
+class BufferedStorage(BaseStorage):
+    """Buffered Storage object
+
+    Wraps any aiogram storage.  While update is processing,
+    state and data of each chat-user are loaded from wrapped
+    storage once, all reads are served from memory and all
+    writes are flushed once, after update processed.  Data,
+    changed only by `update_data`, is flushed as delta, so
+    concurrent updates of one chat do not overwrite keys of
+    each other.
+
+    Out of update processing (also in tasks, that outlive
+    update) storage works as wrapped one.
+
+    >>> dp = Dispatcher(bot, storage=BufferedStorage(RedisStorage2()))
+
+    :param storage: wrapped storage
+    :param pipeline: flush writes concurrently rather than one by one
+
+    """
+
+    def __init__(self, storage: BaseStorage, pipeline: bool = True):
+        self.storage = storage
+        self.pipeline = pipeline
+
+    async def close(self):
+        await self.storage.close()
+
+    async def wait_closed(self):
+        await self.storage.wait_closed()
+
+    def _record(self, chat, user) -> Optional[_Record]:
+        context = current_context()
+
+        if context is None or context.closed:
+            return None
+
+        chat, user = self.check_address(chat=chat, user=user)
+        key = (str(chat), str(user))
+
+        if (record := context.storage.get(key)) is None:
+            record = _Record(chat, user)
+            context.storage[key] = record
+
+        return record
+
+    async def get_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        default: typing.Optional[str] = None) -> typing.Optional[str]:
+
+        if (record := self._record(chat, user)) is None:
+            return await self.storage.get_state(chat=chat, user=user, default=default)
+
+        if record.state is _Record._NOT_LOADED:
+            record.state = await self.storage.get_state(chat=record.chat, user=record.user)
+
+        if record.state is None:
+            return self.resolve_state(default)
+
+        return record.state
+
+    async def get_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       default: typing.Optional[typing.Dict] = None) -> typing.Dict:
+
+        if (record := self._record(chat, user)) is None:
+            return await self.storage.get_data(chat=chat, user=user, default=default)
+
+        if record.data is _Record._NOT_LOADED:
+            record.data = await self.storage.get_data(chat=record.chat, user=record.user, default={}) or {}
+            record.data.update(copy.deepcopy(record.updates))
+
+        return copy.deepcopy(record.data or default or {})
+
+    async def set_state(self, *,
+                        chat: typing.Union[str, int, None] = None,
+                        user: typing.Union[str, int, None] = None,
+                        state: typing.Optional[typing.AnyStr] = None):
+
+        if (record := self._record(chat, user)) is None:
+            return await self.storage.set_state(chat=chat, user=user, state=state)
+
+        record.state = self.resolve_state(state)
+        record.dirty.add('state')
+
+    async def set_data(self, *,
+                       chat: typing.Union[str, int, None] = None,
+                       user: typing.Union[str, int, None] = None,
+                       data: typing.Dict = None):
+
+        if (record := self._record(chat, user)) is None:
+            return await self.storage.set_data(chat=chat, user=user, data=data)
+
+        record.data = copy.deepcopy(data or {})
+        record.updates = {}
+        record.dirty.discard('updates')
+        record.dirty.add('data')
+
+    async def update_data(self, *,
+                          chat: typing.Union[str, int, None] = None,
+                          user: typing.Union[str, int, None] = None,
+                          data: typing.Dict = None,
+                          **kwargs):
+
+        if (record := self._record(chat, user)) is None:
+            return await self.storage.update_data(chat=chat, user=user, data=data, **kwargs)
+
+        changes = copy.deepcopy(dict(data or {}, **kwargs))
+
+        if record.data is not _Record._NOT_LOADED:
+            record.data.update(copy.deepcopy(changes))
+
+        if 'data' not in record.dirty:
+            record.updates.update(changes)
+            record.dirty.add('updates')
+
+    def has_bucket(self):
+        return self.storage.has_bucket()
+
+    async def get_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         default: typing.Optional[dict] = None) -> typing.Dict:
+
+        return await self.storage.get_bucket(chat=chat, user=user, default=default)
+
+    async def set_bucket(self, *,
+                         chat: typing.Union[str, int, None] = None,
+                         user: typing.Union[str, int, None] = None,
+                         bucket: typing.Dict = None):
+
+        return await self.storage.set_bucket(chat=chat, user=user, bucket=bucket)
+
+    async def update_bucket(self, *,
+                            chat: typing.Union[str, int, None] = None,
+                            user: typing.Union[str, int, None] = None,
+                            bucket: typing.Dict = None,
+                            **kwargs):
+
+        return await self.storage.update_bucket(chat=chat, user=user, bucket=bucket, **kwargs)
+
+    async def flush(self) -> None:
+        """Flush method
+
+        Write all changes, made while update processing,
+        to wrapped storage.
+
+        """
+
+        if (context := current_context()) is None:
+            return None
+
+        writes = []
+
+        for record in context.storage.values():
+            if 'state' in record.dirty:
+                writes.append(self.storage.set_state(chat=record.chat,
+                                                     user=record.user,
+                                                     state=record.state))
+            if 'data' in record.dirty:
+                writes.append(self.storage.set_data(chat=record.chat,
+                                                    user=record.user,
+                                                    data=record.data))
+            elif 'updates' in record.dirty:
+                writes.append(self.storage.update_data(chat=record.chat,
+                                                       user=record.user,
+                                                       data=record.updates))
+
+            record.updates = {}
+            record.dirty.clear()
+
+        if self.pipeline:
+            await asyncio.gather(*writes)
+        else:
+            for i in writes:
+                await i
+
+        return None
@@ -0,0 +1,55 @@
+import string
+from typing import Any, Optional
+
+
+class TextTemplate:
+    """Text template object
+
+    Markup text, that parsed once, on markup definition,
+    and formatted on each processing.  Template fields are
+    values, returned by `Markup.text_values`, and `meta`.
+
+    >>> class Balance(Markup):
+    ...     __text__ = TextTemplate('Hi, {meta.from_user.first_name}! '
+    ...                             'Your balance is {balance:.2f}')
+    ...
+    ...     async def text_values(self, meta: DialogMeta):
+    ...         return {'balance': await get_balance(meta.from_user.id)}
+
+    """
+
+    _formatter = string.Formatter()
+
+    def __init__(self, template: str):
+        self.template = template
+
+        self._parts: list[tuple[str, Optional[str], str, Optional[str]]] = []
+        self._is_simple = True
+
+        for literal, field, spec, conversion in self._formatter.parse(template):
+            if field is not None and (field == '' or field.isdigit()):
+                raise ValueError(f'Template `{template}` contains positional field, '
+                                 f'only named fields are supported')
+            if spec and '{' in spec:
+                self._is_simple = False
+
+            self._parts.append((literal, field, spec or '', conversion))
+
+    def format(self, **values: Any) -> str:
+        if not self._is_simple:
+            return self.template.format(**values)
+
+        result = []
+
+        for literal, field, spec, conversion in self._parts:
+            result.append(literal)
+
+            if field is not None:
+                value, _ = self._formatter.get_field(field, (), values)
+                value = self._formatter.convert_field(value, conversion)
+                result.append(format(value, spec))
+
+        return ''.join(result)
+
+    def __repr__(self):
+        return f'<TextTemplate {self.template!r}>'
@@ -1,9 +1,10 @@
 from typing import Type, Union, Protocol, TYPE_CHECKING
 
+from aiogram import Dispatcher
 from aiogram.types import Message, CallbackQuery
 from aiogram.dispatcher.filters import Filter
 
-from aiogram_markups.configuration import get_dp
+from aiogram_markups.configuration import register
 
 from ..helpers import MarkupType
 
@@ -23,23 +24,29 @@ bind_target_alias = Union[Type['Markup'], 'Markup']
 
 
 def bind_call(origin: bind_origin_alias, target: bind_target_alias) -> None:
-    dp = get_dp()
+    filter_ = origin.filter()
 
     async def handler(call: CallbackQuery):
-        await target.process(call.message, MarkupType.INLINE)
+        await target.process(call, MarkupType.INLINE)
 
-    dp.register_callback_query_handler(handler, origin.filter(), state='*')
+    def registration(dp: Dispatcher):
+        dp.register_callback_query_handler(handler, filter_, state='*')
+
+    register(registration)
 
     return None
 
 
 def bind_message(origin: bind_origin_alias, target: bind_target_alias) -> None:
-    dp = get_dp()
+    filter_ = origin.filter()
 
     async def handler(message: Message):
         await target.process(message, MarkupType.TEXT)
 
-    dp.register_message_handler(handler, origin.filter(), state='*', content_types=['any'])
+    def registration(dp: Dispatcher):
+        dp.register_message_handler(handler, filter_, state='*', content_types=['any'])
+
+    register(registration)
 
     return None
 
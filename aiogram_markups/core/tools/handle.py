@@ -1,8 +1,9 @@
 from typing import Type, Union, Protocol, Callable
 
+from aiogram import Dispatcher
 from aiogram.types import ContentTypes
 
-from aiogram_markups.configuration import get_dp
+from aiogram_markups.configuration import register
 
 
 class FilterAble(Protocol):
@@ -15,10 +16,11 @@ handle_target_alias = Union[FilterAble, Type[FilterAble]]
 
 
 def handle_call(*filters) -> Callable[[Callable], Callable]:
-    dp = get_dp()
-
     def deco(handler):
-        dp.register_callback_query_handler(handler, *filters, state='*')
+        def registration(dp: Dispatcher):
+            dp.register_callback_query_handler(handler, *filters, state='*')
+
+        register(registration)
 
         return handler
 
@@ -26,10 +28,11 @@ def handle_call(*filters) -> Callable[[Callable], Callable]:
 
 
 def handle_message(*filters) -> Callable[[Callable], Callable]:
-    dp = get_dp()
-
     def deco(handler):
-        dp.register_message_handler(handler, *filters, state='*', content_types=['any'])
+        def registration(dp: Dispatcher):
+            dp.register_message_handler(handler, *filters, state='*', content_types=['any'])
+
+        register(registration)
 
         return handler
 
@@ -1,9 +1,28 @@
-from typing import Optional
+from typing import Optional, Union, Iterable, Callable, TypeVar, Awaitable, Hashable, Any
 
+import re
+import time
+import asyncio
+import inspect
+import functools
+import contextvars
 import hashlib
+import unicodedata
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
 
-from aiogram.dispatcher.filters import Filter
+from aiogram.types import Message, CallbackQuery
+from aiogram.dispatcher.filters import Filter, StateFilter, Command
 
+from ..configuration import get_dp
+from .dialog_meta import DialogMeta
+from .context import current_context
+from .metrics import metrics
+from .helpers import Cost
+
+
+F = TypeVar('F', bound=Callable)
 
 def hash_text(string: Optional[str]) -> str:
     """Hash text function
@@ -28,9 +47,436 @@ def hash_text(string: Optional[str]) -> str:
     return result
 
 
+class TextNormalizer:
+    """Text normalizer object
+
+    Policy of buttons texts matching.  Normalizer applied once
+    to each button text (on indexing) and once to each incoming
+    text (results of recent texts are cached), so matching is
+    still single dict lookup.
+
+    >>> normalizer = TextNormalizer()
+    >>> normalizer('  My   Button\ufe0f ')
+    'my button'
+
+    """
+
+    _VARIATION_SELECTORS = re.compile('[\ufe00-\ufe0f\U000e0100-\U000e01ef]')
+
+    def __init__(self,
+                 casefold: bool = True,
+                 collapse_whitespace: bool = True,
+                 unicode_nfc: bool = True,
+                 strip_variation_selectors: bool = True,
+                 cache_size: int = 4096):
+
+        self.casefold = casefold
+        self.collapse_whitespace = collapse_whitespace
+        self.unicode_nfc = unicode_nfc
+        self.strip_variation_selectors = strip_variation_selectors
+
+        self._normalize = lru_cache(maxsize=cache_size)(self._apply)
+
+    def _apply(self, text: str) -> str:
+        if self.strip_variation_selectors:
+            text = self._VARIATION_SELECTORS.sub('', text)
+        if self.unicode_nfc:
+            text = unicodedata.normalize('NFC', text)
+        if self.collapse_whitespace:
+            text = ' '.join(text.split())
+        if self.casefold:
+            text = text.casefold()
+
+        return text
+
+    def __call__(self, text: Optional[str]) -> Optional[str]:
+        if not isinstance(text, str):
+            return text
+
+        return self._normalize(text)
+
+
+class TTLCache:
+    """TTL cache object
+
+    Mapping with bounded size, that evicts least recently
+    used entries.  Entries expire after `ttl` seconds (never,
+    if ttl is None).  Ttl can be overwritten for any entry.
+
+    >>> cache = TTLCache(maxsize=2, ttl=60)
+    >>> cache.set('key', 'value')
+    >>> cache.get('key')
+    'value'
+
+    """
+
+    def __init__(self,
+                 maxsize: int = 1024,
+                 ttl: Optional[float] = None,
+                 timer: Callable[[], float] = time.monotonic):
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+
+        self._data: OrderedDict[Hashable, tuple[Optional[float], Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+
+        if expires_at is not None and expires_at <= self.timer():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = None if ttl is None else self.timer() + ttl
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+        return None
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        _, value = self._data.pop(key, (None, default))
+
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+
+        return None
+
+    def __contains__(self, key: Hashable) -> bool:
+        sentinel = object()
+
+        return self.get(key, sentinel) is not sentinel
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def synchronous(func: F) -> F:
+    """Synchronous decorator
+
+    Mark validator as plain (not coroutine) function, so
+    engine calls it directly, without awaiting.
+
+    >>> class Even(Validator):
+    ...     @synchronous
+    ...     def validate(self, meta: DialogMeta) -> bool:
+    ...         return int(meta.content) % 2 == 0
+
+    """
+
+    func.__synchronous__ = True
+
+    return func
+
+
+def pure(func: F) -> F:
+    """Pure decorator
+
+    Mark validator as pure: its result depends only on
+    update, and it has no side effects, so it is run at most
+    once per update.
+
+    """
+
+    func.__pure__ = True
+
+    return func
+
+
+def blocking(func: F) -> F:
+    """Blocking decorator
+
+    Mark hook (`markup_construct`, `__text__`, `text_values`) as
+    plain function, that blocks (sync DB driver, heavy formatting),
+    so engine runs it in thread pool, not in event loop.
+
+    >>> class Report(Markup):
+    ...     @blocking
+    ...     def __text__(self, meta: DialogMeta) -> str:
+    ...         return build_report(db.query(...))
+
+    """
+
+    func.__blocking__ = True
+
+    return func
+
+
+def is_synchronous(func: Callable) -> bool:
+    return getattr(func, '__synchronous__', False)
+
+
+def is_pure(func: Callable) -> bool:
+    return getattr(func, '__pure__', False)
+
+
+def is_blocking(func: Callable) -> bool:
+    return getattr(func, '__blocking__', False)
+
+
+BLOCKING_WORKERS = 4
+
+_executor: Optional[Executor] = None
+
+
+def set_blocking_executor(executor: Optional[Executor]) -> None:
+    """Set blocking executor function
+
+    Set executor of blocking hooks.  By default, it is thread
+    pool with `BLOCKING_WORKERS` threads, created on first use.
+
+    """
+
+    global _executor
+
+    _executor = executor
+
+    return None
+
+
+async def run_blocking(func: Callable, *args) -> Any:
+    """ Call function in executor of blocking hooks, with context of current task """
+
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS,
+                                       thread_name_prefix='markups-blocking')
+
+    context = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+
+    result = await loop.run_in_executor(_executor, functools.partial(context.run, func, *args))
+
+    return result
+
+
+async def run_hook(func: Callable, *args) -> Any:
+    """Run hook function
+
+    Call coroutine function or plain function, blocking ones
+    (see `blocking`) are called in executor, with context of
+    current task.
+
+    """
+
+    if is_blocking(func):
+        return await run_blocking(func, *args)
+
+    result = func(*args)
+
+    if inspect.isawaitable(result):
+        result = await result
+
+    return result
+
+
+def _validator_key(validator: Callable) -> Hashable:
+    """ Identity of validator, same for all bound methods of one object """
+
+    return getattr(validator, '__self__', None), getattr(validator, '__func__', validator)
+
+
+async def _remember(cache: dict, key: Hashable, awaitable: Awaitable[bool]) -> bool:
+    result = cache[key] = await awaitable
+
+    return result
+
+
+def run_validator(validator: Callable, meta: DialogMeta) -> Union[bool, Awaitable[bool]]:
+    """Run validator function
+
+    Returns result of synchronous validator and awaitable
+    for coroutine one, so call it in following way:
+
+    >>> result = run_validator(validator, meta)
+    >>> if inspect.isawaitable(result):
+    ...     result = await result
+
+    Results of pure validators are memoized within update, so
+    each of them runs at most once per update (key is telegram
+    object of update, not content of meta: meta, created with
+    button, has content of button).
+
+    """
+
+    if not is_pure(validator) or (context := current_context()) is None:
+        return validator(meta)
+
+    key = (_validator_key(validator), id(meta.source))
+
+    if key in context.validations:
+        metrics.increment('validator.memo.hit')
+        return context.validations[key]
+
+    metrics.increment('validator.memo.miss')
+
+    if is_synchronous(validator):
+        result = context.validations[key] = validator(meta)
+        return result
+    else:
+        return _remember(context.validations, key, validator(meta))
+
+
+class ValidatorFilter(Filter):
+    """Validator filter
+
+    Make aiogram filter from validator, that receive DialogMeta.
+
+    """
+
+    cost = Cost.VALIDATOR
+
+    def __init__(self, validator: Callable):
+        self.validator = validator
+
+    def evaluate(self, obj) -> Union[bool, Awaitable[bool]]:
+        return run_validator(self.validator, DialogMeta(obj))
+
+    async def check(self, obj) -> bool:
+        result = self.evaluate(obj)
+
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+
 class BoolFilter(Filter):
+    cost = Cost.CONSTANT
+
     def __init__(self, boolean: bool):
         self.boolean = boolean
 
+    def evaluate(self, *args) -> bool:
+        return self.boolean
+
     async def check(self, *args) -> bool:
         return self.boolean
+
+
+class CurrentStateFilter(Filter):
+    """Current state filter
+
+    Same as aiogram `StateFilter`, but not bound to dispatcher:
+    storage of dispatcher, that processes update, used on check.
+
+    """
+
+    cost = Cost.STATE
+
+    def __init__(self, state: str):
+        self.state = state
+
+    async def check(self, obj) -> bool:
+        dp = get_dp()
+
+        return await StateFilter(dp, self.state).check(obj)
+
+
+@lru_cache(maxsize=4096)
+def parse_command(text: str) -> Optional[tuple[str, str, str, Optional[str]]]:
+    """Parse command function
+
+    Parse message text once, result is shared between all
+    commands checks.
+
+    :returns: (prefix, command, mention, args) or None
+
+    """
+
+    if not text:
+        return None
+
+    full_command, *args_list = text.split(maxsplit=1)
+    args = args_list[0] if args_list else None
+    prefix, (command, _, mention) = full_command[0], full_command[1:].partition('@')
+
+    return prefix, command, mention, args
+
+
+def compile_texts(value: Union[str, Iterable[str], None],
+                  lower: bool = False) -> Optional[frozenset[str]]:
+    """ Compile str or iterable of str to frozenset """
+
+    if value is None:
+        return None
+
+    if isinstance(value, str):
+        value = [value]
+
+    if lower:
+        return frozenset(str(i).lower() for i in value)
+    else:
+        return frozenset(str(i) for i in value)
+
+
+class CommandsFilter(Filter):
+    """Commands filter
+
+    Same as aiogram `Command` with default options, but
+    check is set membership of parsed command.
+
+    """
+
+    PREFIX = '/'
+    cost = Cost.TEXT
+
+    def __init__(self, commands: frozenset[str]):
+        self.commands = commands
+
+    async def check(self, obj):
+        if not isinstance(obj, Message) or not obj.text:
+            return False
+
+        prefix, command, mention, args = parse_command(obj.text)
+
+        if prefix != self.PREFIX or command.lower() not in self.commands:
+            return False
+        if mention and (await obj.bot.me).username.lower() != mention.lower():
+            return False
+
+        return {'command': Command.CommandObj(prefix=prefix, command=command,
+                                              mention=mention, args=args)}
+
+
+class TextsFilter(Filter):
+    """Texts filter
+
+    Same as aiogram `Text(equals=...)`, but check is
+    set membership.
+
+    """
+
+    cost = Cost.TEXT
+
+    def __init__(self, texts: frozenset[str]):
+        self.texts = texts
+
+    def evaluate(self, obj) -> bool:
+        if isinstance(obj, Message):
+            text = obj.text or obj.caption
+        elif isinstance(obj, CallbackQuery):
+            text = obj.data
+        else:
+            return False
+
+        return text in self.texts
+
+    async def check(self, obj) -> bool:
+        return self.evaluate(obj)
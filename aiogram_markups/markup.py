@@ -1,17 +1,24 @@
 import abc
-from typing import Union, Type, Iterable, Optional, Callable, Awaitable, Literal, TypeVar
+import time
+from typing import Union, Type, Iterable, Optional, Callable, Awaitable, Literal, TypeVar, Hashable, Mapping, Any
 from copy import copy
 
 
+from aiogram import Dispatcher
 from aiogram.types import ReplyKeyboardMarkup, InlineKeyboardMarkup, Message, CallbackQuery
 
-from .core.helpers import MarkupType, Orientation
+from .core.helpers import MarkupType, Orientation, MarkupScope
 from .core.button import Button
-from .core.markup_core import MarkupCore, MarkupBehavior
+from .core.markup_core import MarkupCore, MarkupBehavior, process_ordered
 from .core.dialog_meta import DialogMeta
 from .core.button import DefinitionScope
 from .validator import Validator
 from .core.markup_scheme import MarkupScheme, MarkupConstructor
+from .core.registry import StateRegistry
+from .core.utils import TTLCache
+from .core.text import TextTemplate
+from .core.metrics import metrics
+from .core.limits import KeyboardLimits, KeyboardLimitExceeded, Overflow, DEFAULT_LIMITS
 
 
 T = TypeVar('T')
@@ -98,27 +105,76 @@ class Markup(metaclass=MarkupMeta):
         markup of this Markup, and you can configure it haw you
         want.
 
+        Also, it can be (sync or async) generator of rows (lists of
+        buttons): rows are appended to markup and consumed only until
+        keyboard limits (`__limits__`) are reached.
+
+        >>> async def markup_construct(self, meta, constructor):
+        ...     async for product in db.products():
+        ...         yield [MarkupSchemeButton(product.name, f'product:{product.id}')]
+
         :returns: markup is exists
 
         """
 
         return True
 
-    __text__: Optional[Union[str, Callable[['Markup', DialogMeta], Awaitable[Optional[str]]]]]
+    def construct_cache_key(self, meta: DialogMeta) -> Optional[Hashable]:
+        """Cache key of runtime markup construct
+
+        Override it to cache results of `markup_construct`:
+        markup is constructed once for each key (for example,
+        user role and locale) and reused for `__construct_ttl__`
+        seconds.  Return None to skip cache.
+
+        >>> class Menu(Markup):
+        ...     __construct_ttl__ = 60
+        ...
+        ...     def construct_cache_key(self, meta: DialogMeta):
+        ...         return meta.from_user.language_code
+
+        """
+
+        return None
+
+    async def text_values(self, meta: DialogMeta) -> Mapping[str, Any]:
+        """ Values of `__text__` fields, if it is TextTemplate """
+
+        return {}
+
+    def text_cache_key(self, meta: DialogMeta) -> Optional[Hashable]:
+        """Cache key of text
+
+        Override it to cache text, built by coroutine `__text__`,
+        for `__text_ttl__` seconds.  Return None to skip cache.
+
+        """
+
+        return None
+
+    __text__: Optional[Union[str, TextTemplate, Callable[['Markup', DialogMeta], Awaitable[Optional[str]]]]]
     __validator__: Validator = None
     __orientation__ = Orientation.UNDEFINED
     __ignore_state__ = False
+    __debounce__: Optional[float] = None
     __width__ = 1
     __global__ = False
     __definition_scope__: DefinitionScope = None
     __state__ = None  # simple `definition scope` state define
     __markup_scope__ = 'm+c'
+    __construct_ttl__: Optional[float] = None
+    __construct_cache_size__ = 1024
+    __text_ttl__: Optional[float] = None
+    __text_cache_size__ = 1024
+    __limits__: Optional[KeyboardLimits] = None
 
     __core__: Optional[MarkupCore] = None
 
-    _ALL_STATES: list[str] = []
+    _STATES = StateRegistry()
     _LINKED: list[Type['Markup']] = []
     _CONTEXT = None
+    _CONSTRUCT_CACHE: Optional[TTLCache] = None
+    _TEXT_CACHE: Optional[TTLCache] = None
 
     def __class_getitem__(cls, item: Literal[None, False]):
         """
@@ -155,6 +211,13 @@ class Markup(metaclass=MarkupMeta):
 
         cls.__core__ = MarkupCore()
 
+        if cls.construct_cache_key != Markup.construct_cache_key:
+            cls._CONSTRUCT_CACHE = TTLCache(maxsize=cls.__construct_cache_size__,
+                                            ttl=cls.__construct_ttl__)
+        if cls.text_cache_key != Markup.text_cache_key:
+            cls._TEXT_CACHE = TTLCache(maxsize=cls.__text_cache_size__,
+                                       ttl=cls.__text_ttl__)
+
         # select all buttons from cls
         buttons: list[Button] = []
 
@@ -175,19 +238,27 @@ class Markup(metaclass=MarkupMeta):
 
         cls.__core__.buttons = buttons
         cls._synchronize_magic_fields()
+        cls.check_limits()
 
         if cls.__validator__ is not None:
-            validator = cls.__validator__.validate
+            validator = cls.__validator__.get_validator()
         elif cls.validate != Markup.validate:
-            validator = cls().validate
+            validator = cls._instance().validate
         else:
             validator = None
 
+        timing = f'markup.{cls._unique_context_state()}'
+
         async def handler(meta: DialogMeta):
-            await cls().handler(meta)
+            start = time.perf_counter()
+
+            try:
+                await cls().handler(meta)
 
-            for i in cls._LINKED:
-                await i.process(meta.source)
+                if cls._LINKED:
+                    await Markup.process_ordered(meta.source, *cls._LINKED)
+            finally:
+                metrics.observe(timing, time.perf_counter() - start)
 
         cls.__core__.apply_behavior(MarkupBehavior(handler=handler,
                                                    validator=validator,
@@ -250,24 +321,117 @@ class Markup(metaclass=MarkupMeta):
                                       'and `Markup` types')
 
         cls.__core__.struct_buttons()
+        cls.check_limits()
+
+    @classmethod
+    def check_limits(cls) -> None:
+        """Check limits method
+
+        Check static buttons of markup against Bot API limits
+        (`__limits__`), so invalid markup fails on definition,
+        not on sending.  Too many buttons or too wide rows fail
+        with `Overflow.RAISE` (default, with `Overflow.TRUNCATE`
+        they are cut off or wrapped on render), callback data is
+        checked, if markup can be sent as inline one.
+
+        :raises KeyboardLimitExceeded:
+
+        """
+
+        if cls.__core__.is_null:
+            return None
+
+        limits = cls.__limits__ or DEFAULT_LIMITS
+        buttons = cls.__core__.buttons
+
+        def fail(reason: str):
+            raise KeyboardLimitExceeded(f'Markup `{cls.__qualname__}`: {reason}')
+
+        if limits.overflow == Overflow.RAISE:
+            if len(buttons) > limits.buttons:
+                fail(f'{len(buttons)} buttons, but limit is {limits.buttons}')
+            if cls.__width__ > limits.row_width:
+                fail(f'width {cls.__width__}, but limit is {limits.row_width}')
+
+        check_callback_data = limits.callback_data is not None and cls.__markup_scope__ != MarkupScope.MESSAGE
+
+        for i in buttons:
+            if any(text is None or not str(text).strip() for text in i.texts):
+                fail(f'button `{i!r}` has empty text')
+
+            if not check_callback_data:
+                continue
+
+            callback_data = i.inline().callback_data
+
+            if len(callback_data.encode()) > limits.callback_data:
+                fail(f'callback data `{callback_data}` is longer than {limits.callback_data} bytes')
+
+        return None
 
     @classmethod
     async def process(cls,
                       obj: Union[Message, CallbackQuery],
-                      markup_type: str = None) -> Message:
+                      markup_type: str = None,
+                      force: bool = False,
+                      dp: Dispatcher = None) -> Optional[Message]:
 
         """Process keyboard method
 
-        Processing keyboard in passed chat
+        Processing keyboard in passed chat.  Reply keyboard, that
+        is already open in chat, is not sent again, unless `force`.
+        Out of update processing with several dispatchers, pass
+        `dp`, whose bot must send keyboard.
 
         """
 
         cls._synchronize_magic_fields()
 
-        result = await cls.__core__.process(obj, markup_type)
+        result = await cls.__core__.process(obj, markup_type, force, dp)
+
+        return result
+
+    @staticmethod
+    async def process_ordered(obj: Union[Message, CallbackQuery],
+                              *markups: Type['Markup'],
+                              dp: Dispatcher = None) -> list[Optional[Message]]:
+
+        """Process ordered method
+
+        Processing several keyboards in passed chat.  Keyboards are
+        rendered concurrently, but sent in passed order.
+
+        """
+
+        for i in markups:
+            i._synchronize_magic_fields()
+
+        result = await process_ordered([i.__core__ for i in markups], obj, dp)
 
         return result
 
+    @classmethod
+    def invalidate_construct(cls, key: Hashable = None) -> None:
+        """Invalidate construct method
+
+        Drop cached construct results of this markup and
+        its subclasses: only for passed key or all of them.
+
+        >>> Markup.invalidate_construct(user_role)  # all markups
+
+        """
+
+        if cls._CONSTRUCT_CACHE is not None:
+            if key is None:
+                cls._CONSTRUCT_CACHE.clear()
+            else:
+                cls._CONSTRUCT_CACHE.pop(key)
+
+        for i in cls.__subclasses__():
+            i.invalidate_construct(key)
+
+        return None
+
     @classmethod
     def customize(cls, text: str) -> Type['Markup']:
         new = cls.copy()
@@ -285,39 +449,50 @@ class Markup(metaclass=MarkupMeta):
 
     @classmethod
     def _unique_context_state(cls) -> str:
-        def validate(text: str):
-            return text not in cls._ALL_STATES
+        """Unique context state
 
-        result = cls.__name__
+        State name is module-qualified name of class, so it is
+        same in all processes and after restarts.
 
-        if not validate(result):
-            result += '-' + str(cls._ALL_STATES.count(result))
+        """
 
-        return result
+        return f'{cls.__module__}.{cls.__qualname__}'
 
     @classmethod
     def _configure_state(cls):
         if cls.__state__ is not None:
-            state = cls.__state__
+            state = cls._STATES.register(cls.__state__)
         else:
-            state = cls._unique_context_state()
+            state = cls._STATES.register(cls._unique_context_state(), owner=cls)
+
+        cls.__core__.definition_scope = DefinitionScope(state=state)
+        cls.__definition_scope__ = cls.__core__.definition_scope
+
+    @classmethod
+    def _instance(cls) -> 'Markup':
+        """ Shared instance, used to read fields and methods """
 
-        if state is not None:
-            cls.__core__.definition_scope = DefinitionScope(state=state)
-            cls.__definition_scope__ = cls.__core__.definition_scope
+        if '_INSTANCE' not in vars(cls):
+            cls._INSTANCE = cls()
 
-        if cls.__core__.definition_scope.state not in cls._ALL_STATES:
-            cls._ALL_STATES.append(cls.__core__.definition_scope.state)
+        return cls._INSTANCE
 
     @classmethod
     def _synchronize_magic_fields(cls):
+        instance = cls._instance()
 
-        cls.__core__.text = cls().__text__
+        cls.__core__.text = instance.__text__
+        cls.__core__.text_values = instance.text_values
+        cls.__core__.text_cache = cls._TEXT_CACHE
+        cls.__core__.text_cache_key = instance.text_cache_key
         cls.__core__.width = cls.__width__
         cls.__core__.markup_scope = cls.__markup_scope__
         cls.__core__.definition_scope = cls.__definition_scope__
 
-        cls.__core__.markup_scheme = MarkupScheme(cls().markup_construct)
+        cls.__core__.markup_scheme = MarkupScheme(instance.markup_construct,
+                                                  cache=cls._CONSTRUCT_CACHE,
+                                                  cache_key=instance.construct_cache_key,
+                                                  limits=cls.__limits__)
 
         if cls.__definition_scope__ is None:
             cls._configure_state()
@@ -325,5 +500,6 @@ class Markup(metaclass=MarkupMeta):
         cls.__core__.synchronize_buttons(
             orientation=cls.__orientation__,
             definition_scope=cls.__core__.definition_scope,
-            ignore_state=cls.__ignore_state__
+            ignore_state=cls.__ignore_state__,
+            debounce=cls.__debounce__
         )
@@ -0,0 +1,2 @@
+from .bot import FakeBot
+from .replay import UpdatesRecorder, ReplayReport, load_updates, replay
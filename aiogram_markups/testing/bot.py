@@ -0,0 +1,200 @@
+"""Fake bot
+
+Bot, that answers Bot API requests in-process, without network.
+Use it to run dispatcher with markups offline: in tests,
+benchmarks and updates replay.
+
+Supported methods are sendMessage, editMessageText,
+editMessageReplyMarkup and answerCallbackQuery (other methods
+are answered with True).  Sent messages are kept, so edits
+return edited message (edit of unknown message fails with
+`MessageToEditNotFound`, as Bot API does).  Only `max_messages`
+recently sent or edited messages are kept, older ones are
+unknown, so long replays use bounded memory.  Use `reset` to
+drop calls, messages and injections between runs.
+
+>>> bot = FakeBot(latency=0.05)
+>>> bot.inject('editMessageText', MessageCantBeEdited("Message can't be edited"), times=1)
+>>> bot.inject('sendMessage', lambda: RetryAfter(3), rate=0.01)
+>>> dp = Dispatcher(bot)
+>>> ...
+>>> bot.calls_of('sendMessage')
+
+"""
+
+
+import json
+import time
+import random
+import asyncio
+from typing import Any, Optional, Union, Callable, NamedTuple
+
+from aiogram import Bot
+from aiogram.utils.exceptions import MessageToEditNotFound
+
+from ..core.utils import TTLCache
+
+
+latency_alias = Union[float, Callable[[str], float]]
+error_alias = Union[Exception, Callable[[], Exception]]
+
+
+class Call(NamedTuple):
+    method: str
+    data: dict[str, Any]
+
+
+class _Injection:
+    def __init__(self, method: str, error: error_alias, times: Optional[int], rate: float):
+        self.method = method
+        self.error = error
+        self.times = times
+        self.rate = rate
+
+    def fire(self, rnd: random.Random) -> Optional[Exception]:
+        if self.times == 0 or rnd.random() >= self.rate:
+            return None
+
+        if self.times is not None:
+            self.times -= 1
+
+        if isinstance(self.error, Exception):
+            return self.error
+
+        return self.error()
+
+
+class FakeBot(Bot):
+    """Fake Bot object
+
+    Records all requests to `calls` and answers them after
+    `latency` seconds (number or function of method name).
+    Errors are injected by `inject`.
+
+    """
+
+    def __init__(self,
+                 token: str = '1:faketoken',
+                 latency: latency_alias = 0.0,
+                 seed: int = None,
+                 max_messages: int = 10000,
+                 **kwargs):
+
+        super().__init__(token, **kwargs)
+
+        self.latency = latency
+        self.calls: list[Call] = []
+        self.messages = TTLCache(maxsize=max_messages)
+
+        self._injections: list[_Injection] = []
+        self._random = random.Random(seed)
+        self._message_id = 0
+
+        self._methods: dict[str, Callable[[dict[str, Any]], Union[dict, list, bool]]] = {
+            'sendMessage': self._send_message,
+            'editMessageText': self._edit_message,
+            'editMessageReplyMarkup': self._edit_message,
+            'answerCallbackQuery': lambda data: True,
+        }
+
+    def inject(self, method: str,
+               error: error_alias,
+               times: int = None,
+               rate: float = 1.0) -> None:
+
+        """Inject method
+
+        Make method fail with error (exception or function, that
+        creates it): `times` times (always, if None), each call with
+        probability `rate`.
+
+        """
+
+        self._injections.append(_Injection(method, error, times, rate))
+
+        return None
+
+    def calls_of(self, method: str) -> list[dict[str, Any]]:
+        result = [i.data for i in self.calls if i.method == method]
+
+        return result
+
+    def reset(self) -> None:
+        """ Reset method, forget calls, messages and injections """
+
+        self.calls.clear()
+        self.messages.clear()
+        self._injections.clear()
+
+        return None
+
+    async def request(self, method: str,
+                      data: Optional[dict] = None,
+                      files: Optional[dict] = None, **kwargs) -> Union[dict, list, bool]:
+
+        data = dict(data or {})
+        self.calls.append(Call(method, data))
+
+        latency = self.latency(method) if callable(self.latency) else self.latency
+
+        if latency:
+            await asyncio.sleep(latency)
+
+        for i in self._injections:
+            if i.method == method and (error := i.fire(self._random)) is not None:
+                raise error
+
+        result = self.respond(method, data)
+
+        return result
+
+    def respond(self, method: str, data: dict[str, Any]) -> Union[dict, list, bool]:
+        """ Build Bot API result of method """
+
+        if method in self._methods:
+            return self._methods[method](data)
+
+        return True
+
+    def _send_message(self, data: dict[str, Any]) -> dict[str, Any]:
+        self._message_id += 1
+
+        result = self._message(data, self._message_id)
+
+        return result
+
+    def _edit_message(self, data: dict[str, Any]) -> Union[dict[str, Any], bool]:
+        if 'inline_message_id' in data:
+            return True
+
+        if (int(data.get('chat_id', 0)), int(data['message_id'])) not in self.messages:
+            raise MessageToEditNotFound('Message to edit not found')
+
+        result = self._message(data, int(data['message_id']))
+
+        return result
+
+    def _message(self, data: dict[str, Any], message_id: int) -> dict[str, Any]:
+        chat_id = int(data.get('chat_id', 0))
+        message = self.messages.get((chat_id, message_id))
+
+        if message is None:
+            message = {
+                'message_id': message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+            }
+
+        if 'text' in data:
+            message['text'] = data['text']
+
+        reply_markup = data.get('reply_markup')
+
+        if isinstance(reply_markup, str):
+            reply_markup = json.loads(reply_markup)
+        if isinstance(reply_markup, dict) and 'inline_keyboard' in reply_markup:
+            message['reply_markup'] = reply_markup
+
+        self.messages.set((chat_id, message_id), message)
+
+        return message
@@ -0,0 +1,219 @@
+"""Updates replay
+
+Record updates, received by bot, to JSONL file and replay them
+offline, through dispatcher with markups and fake bot.  Report
+shows throughput, latency of markups handlers and number of
+Bot API calls.
+
+Record (in production):
+
+>>> recorder = UpdatesRecorder('updates.jsonl')
+>>> dp.setup_middleware(recorder)
+>>> ...
+>>> await recorder.close()  # e.g. on shutdown
+
+Replay:
+
+>>> bot = FakeBot(latency=0.05)
+>>> dp = Dispatcher(bot)
+>>> setup_aiogram_keyboards(dp)
+>>> report = await replay(dp, load_updates('updates.jsonl'), concurrency=100)
+>>> print(report)
+
+Note: replay resets engine metrics (see `core.metrics`).
+
+"""
+
+
+import json
+import time
+import asyncio
+from typing import Iterable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.dispatcher.middlewares import BaseMiddleware
+
+from ..core.metrics import metrics
+from ..core.utils import run_blocking
+from .bot import FakeBot
+
+
+class UpdatesRecorder(BaseMiddleware):
+    """Updates recorder
+
+    Writes every incoming update to JSONL file (one update per line).
+    Updates are queued and written by background task in executor,
+    so file writes do not block event loop.  Close recorder to write
+    queued updates (or use it as async context manager).
+
+    """
+
+    _CLOSE = object()
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'a', encoding='utf-8')
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self.closed = False
+
+        super().__init__()
+
+    async def on_pre_process_update(self, update: Update, _data: dict):
+        if self.closed:
+            return None
+
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.ensure_future(self._write_queued())
+
+        self._queue.put_nowait(json.dumps(update.to_python(), ensure_ascii=False) + '\n')
+
+    async def _write_queued(self) -> None:
+        is_closed = False
+
+        while not is_closed:
+            lines = [await self._queue.get()]
+
+            while not self._queue.empty():
+                lines.append(self._queue.get_nowait())
+
+            if self._CLOSE in lines:
+                is_closed = True
+                lines = [i for i in lines if i is not self._CLOSE]
+
+            await run_blocking(self._write, ''.join(lines))
+
+        return None
+
+    def _write(self, text: str) -> None:
+        self._file.write(text)
+        self._file.flush()
+
+        return None
+
+    async def close(self) -> None:
+        """ Close method, write queued updates and close file """
+
+        if self.closed:
+            return None
+
+        self.closed = True
+
+        if self._writer is not None:
+            self._queue.put_nowait(self._CLOSE)
+            await self._writer
+
+        await run_blocking(self._file.close)
+
+        return None
+
+    async def __aenter__(self) -> 'UpdatesRecorder':
+        return self
+
+    async def __aexit__(self, *_exc_info) -> None:
+        await self.close()
+
+
+def load_updates(path: str) -> list[Update]:
+    """ Load updates, recorded by `UpdatesRecorder` """
+
+    with open(path, encoding='utf-8') as file:
+        result = [Update.to_object(json.loads(line)) for line in file if line.strip()]
+
+    return result
+
+
+class ReplayReport:
+    """Replay report
+
+    Latencies are (p50, p90, p99) of markups handlers, in seconds.
+
+    """
+
+    def __init__(self,
+                 updates: int,
+                 seconds: float,
+                 errors: int,
+                 api_calls: Optional[int],
+                 latencies: dict[str, tuple[float, float, float]]):
+
+        self.updates = updates
+        self.seconds = seconds
+        self.errors = errors
+        self.api_calls = api_calls
+        self.latencies = latencies
+
+    @property
+    def updates_per_second(self) -> float:
+        return self.updates / self.seconds if self.seconds else 0.0
+
+    @property
+    def api_calls_per_update(self) -> Optional[float]:
+        if self.api_calls is None or not self.updates:
+            return None
+
+        return self.api_calls / self.updates
+
+    def __str__(self):
+        lines = [f'{self.updates} updates in {self.seconds:.3f}s '
+                 f'({self.updates_per_second:.1f} updates/s), {self.errors} errors']
+
+        if self.api_calls is not None:
+            lines.append(f'{self.api_calls} API calls ({self.api_calls_per_update:.2f} per update)')
+
+        for name, (p50, p90, p99) in sorted(self.latencies.items()):
+            lines.append(f'{name}: p50 {p50 * 1000:.2f}ms, p90 {p90 * 1000:.2f}ms, p99 {p99 * 1000:.2f}ms')
+
+        return '\n'.join(lines)
+
+
+async def replay(dp: Dispatcher,
+                 updates: Iterable[Update],
+                 concurrency: int = 1) -> ReplayReport:
+
+    """Replay function
+
+    Process updates by dispatcher, at most `concurrency` at a time.
+    Errors of processing are counted, not raised.
+
+    """
+
+    updates = list(updates)
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    Bot.set_current(dp.bot)
+    Dispatcher.set_current(dp)
+    metrics.reset()
+
+    is_fake = isinstance(dp.bot, FakeBot)
+    calls_before = len(dp.bot.calls) if is_fake else 0
+
+    async def process(update: Update):
+        nonlocal errors
+
+        async with semaphore:
+            try:
+                await dp.updates_handler.notify(update)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[process(i) for i in updates])
+    seconds = time.perf_counter() - start
+
+    latencies = {}
+
+    for name in list(metrics.timings):
+        if name.startswith('markup.'):
+            latencies[name[len('markup.'):]] = tuple(metrics.percentile(name, q) for q in (50, 90, 99))
+
+    result = ReplayReport(updates=len(updates),
+                          seconds=seconds,
+                          errors=errors,
+                          api_calls=len(dp.bot.calls) - calls_before if is_fake else None,
+                          latencies=latencies)
+
+    return result
@@ -1,9 +1,33 @@
 from abc import abstractmethod
+from typing import Union, Awaitable, Callable
 
 from aiogram_markups.core.dialog_meta import DialogMeta
+from aiogram_markups.core.utils import is_synchronous
 
 
 class Validator:
+    """Validator object
+
+    Validate method can be coroutine or, if decorated
+    with `synchronous`, plain function.  Mark it with `pure`,
+    if result depends only on update content.
+
+    Validator with coroutine `validate` can also provide method
+    `check`, decorated with `synchronous`: engine calls it
+    instead of `validate`, without awaiting.
+
+    """
+
     @abstractmethod
-    async def validate(self, meta: 'DialogMeta') -> bool:
+    def validate(self, meta: 'DialogMeta') -> Union[bool, Awaitable[bool]]:
         pass
+
+    def get_validator(self) -> Callable[['DialogMeta'], Union[bool, Awaitable[bool]]]:
+        """ Returns function, that engine calls to validate """
+
+        check = getattr(self, 'check', None)
+
+        if check is not None and is_synchronous(check):
+            return check
+
+        return self.validate
@@ -0,0 +1,73 @@
+"""Filters benchmark
+
+Compare compiled markup filter with nested aiogram filters chain,
+built in the old way, for markup of 200 buttons.
+
+    python benchmarks/filters.py
+
+"""
+
+
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message, Chat, User
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.core.limits import KeyboardLimits, Overflow
+from aiogram_markups.core.utils import BoolFilter
+
+
+BUTTONS = 200
+ROUNDS = 2000
+
+
+def nested_filter(markup) -> BoolFilter:
+    result = BoolFilter(False)
+
+    for i in markup.get_choices():
+        scope = BoolFilter(True).__and__(i.definition_scope.filter)
+        result = result.__or__(scope.__and__(BoolFilter(False).__or__(i.check_content)))
+
+    return result
+
+
+def make_message(text: str) -> Message:
+    return Message(**{
+        'message_id': 1,
+        'date': 0,
+        'chat': {'id': 10, 'type': 'private'},
+        'from': {'id': 10, 'is_bot': False, 'first_name': 'User'},
+        'text': text,
+    })
+
+
+async def measure(filter_, message: Message) -> float:
+    start = time.perf_counter()
+
+    for _ in range(ROUNDS):
+        await filter_.check(message)
+
+    return (time.perf_counter() - start) / ROUNDS * 1e6
+
+
+async def main():
+    setup_aiogram_keyboards(Dispatcher(Bot('1:faketoken')))
+
+    markup = type('Menu', (Markup,), {'__limits__': KeyboardLimits(overflow=Overflow.TRUNCATE),
+                                      **{f'b{n}': Button(f'Button {n}') for n in range(BUTTONS)}})
+    message = make_message(f'Button {BUTTONS - 1}')
+
+    Chat.set_current(message.chat)
+    User.set_current(message.from_user)
+
+    for name, filter_ in [('nested', nested_filter(markup)), ('compiled', markup.filter())]:
+        hit = await measure(filter_, message)
+        miss = await measure(filter_, make_message('Not a button'))
+
+        print(f'{name:>10}: last button {hit:8.1f} us, miss {miss:8.1f} us')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Process benchmark
+
+Load test of `Markup.process` and message edits on button press
+with fake Bot API: requests take `LATENCY` seconds, tenth part of
+edits fails with `MessageCantBeEdited` (markup is sent instead).
+
+    python benchmarks/process.py
+
+"""
+
+
+import asyncio
+import time
+
+from aiogram import Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Update
+from aiogram.utils.exceptions import MessageCantBeEdited
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.testing import FakeBot, replay
+
+
+CHATS = 500
+LATENCY = 0.02
+
+
+class Settings(Markup):
+    __text__ = 'Settings'
+
+    back = Button('Back')
+
+
+class Menu(Markup):
+    __state__ = '*'
+    __text__ = 'Menu'
+
+    settings = Button('Settings')
+
+    async def handler(self, meta):
+        await Settings.process(meta.source)
+
+
+def make_update(chat_id: int, message_id: int = 1) -> Update:
+    return Update(**{
+        'update_id': chat_id,
+        'callback_query': {
+            'id': str(chat_id),
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'User'},
+            'chat_instance': str(chat_id),
+            'data': Menu.settings.inline().callback_data,
+            'message': {'message_id': message_id, 'date': 0, 'chat': {'id': chat_id, 'type': 'private'},
+                        'from': {'id': 1, 'is_bot': True, 'first_name': 'Bot'}},
+        },
+    })
+
+
+async def main():
+    bot = FakeBot(latency=LATENCY, seed=0)
+    bot.inject('editMessageText', lambda: MessageCantBeEdited("Message can't be edited"), rate=0.1)
+
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    setup_aiogram_keyboards(dp, answer_callbacks='auto')
+
+    start = time.perf_counter()
+    updates = [make_update(i).callback_query.message for i in range(CHATS)]
+    sent = await asyncio.gather(*[Menu.process(i) for i in updates])
+    seconds = time.perf_counter() - start
+
+    print(f'process: {CHATS} chats in {seconds:.3f}s ({CHATS / seconds:.1f}/s)')
+
+    bot.calls.clear()
+
+    report = await replay(dp, [make_update(i, sent[i].message_id) for i in range(CHATS)], concurrency=100)
+
+    print(f'button press (callback edits):\n{report}')
+    print({method: len(bot.calls_of(method)) for method in {i.method for i in bot.calls}})
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
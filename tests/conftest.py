@@ -0,0 +1,47 @@
+import pytest
+
+from aiogram.types import Message, Update
+
+from aiogram_markups import configuration
+from aiogram_markups.core.dialog_meta import DialogMeta
+
+
+def make_message(text: str = 'text', chat_id: int = 10, language_code: str = None) -> Message:
+    user = {'id': chat_id, 'is_bot': False, 'first_name': 'User'}
+
+    if language_code is not None:
+        user['language_code'] = language_code
+
+    return Message(**{
+        'message_id': 1,
+        'date': 0,
+        'chat': {'id': chat_id, 'type': 'private'},
+        'from': user,
+        'text': text,
+    })
+
+
+def make_meta(text: str = 'text', **kwargs) -> DialogMeta:
+    return DialogMeta(make_message(text, **kwargs))
+
+
+def make_update(text: str = 'text', update_id: int = 1, **kwargs) -> Update:
+    return Update(update_id=update_id, message=make_message(text, **kwargs).to_python())
+
+
+@pytest.fixture(autouse=True)
+def restore_configuration():
+    """ Dispatchers, set up by test, are forgotten after it """
+
+    saved = (configuration.DP,
+             list(configuration.DISPATCHERS),
+             list(configuration.REGISTRATIONS),
+             dict(configuration.SCHEDULERS))
+
+    yield
+
+    configuration.DP = saved[0]
+    configuration.DISPATCHERS[:] = saved[1]
+    configuration.REGISTRATIONS[:] = saved[2]
+    configuration.SCHEDULERS.clear()
+    configuration.SCHEDULERS.update(saved[3])
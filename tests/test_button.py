@@ -0,0 +1,63 @@
+from aiogram.types import CallbackQuery
+
+from aiogram_markups import Button
+from aiogram_markups.core.utils import TextNormalizer
+
+from .conftest import make_message
+
+
+settings = Button('⚙️ Settings')
+
+
+def test_exact_match_by_default():
+    assert Button._from_text('⚙️ Settings') == [settings]
+    assert '⚙ settings ' not in Button._text_index
+
+
+def test_normalized_match():
+    Button.set_normalizer(TextNormalizer())
+
+    try:
+        assert Button._from_text('⚙ settings ') == [settings]
+        assert Button._from_text('⚙️  SETTINGS') == [settings]
+    finally:
+        Button.set_normalizer(None)
+
+
+start = Button('Start', labels={'ru': 'Начать', 'pt-BR': 'Começar'})
+
+
+def test_localized_labels_match_one_button():
+    assert Button._from_text('Начать') == [start]
+    assert Button._from_text('Começar') == [start]
+    assert len(Button._exemplars[start.__content_hash__()]) == 1
+
+
+def test_label_resolution():
+    assert start.label('ru-RU') == 'Начать'
+    assert start.label('pt-BR') == 'Começar'
+    assert start.label('de') == 'Start'
+    assert start.label(None) == 'Start'
+    assert start.inline(locale='ru').callback_data == start.inline().callback_data
+
+
+def make_call(data: str) -> CallbackQuery:
+    return CallbackQuery(**{'id': '1', 'chat_instance': '1', 'data': data})
+
+
+def test_known_content(monkeypatch):
+    monkeypatch.setattr(Button, '_global_validators', {})
+
+    assert Button.is_known(make_message('Начать'))
+    assert Button.is_known(make_call(start.inline().callback_data))
+    assert not Button.is_known(make_message('Just chatting'))
+    assert not Button.is_known(make_call('no colon'))
+    assert not Button.is_known(make_call('vote:up:1'))
+
+    catch_all = Button('Catch all', validator=lambda meta: True, is_global=True)
+
+    assert Button.is_known(make_message('Just chatting'))
+
+    catch_all.is_global = False
+
+    assert not Button.is_known(make_message('Just chatting'))
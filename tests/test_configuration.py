@@ -0,0 +1,75 @@
+import contextvars
+
+import pytest
+
+from aiogram import Dispatcher, Bot
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiogram_markups import setup_aiogram_keyboards, Markup, Button
+from aiogram_markups.configuration import get_dp
+from aiogram_markups.testing import FakeBot
+
+from .conftest import make_message
+
+
+def make_dp():
+    bot = Bot('1:faketoken')
+    dispatcher = Dispatcher(bot)
+
+    setup_aiogram_keyboards(dispatcher)
+
+    return dispatcher
+
+
+def handlers_of(dispatcher: Dispatcher):
+    return [i.handler for i in dispatcher.message_handlers.handlers]
+
+
+def test_markup_attached_to_all_dispatchers():
+    first = make_dp()
+
+    class MultiBotMenu(Markup):
+        item = Button('Multi bot item')
+
+    second = make_dp()
+
+    assert handlers_of(first)
+    assert handlers_of(first) == handlers_of(second)
+
+
+def test_current_dispatcher():
+    first = make_dp()
+    second = make_dp()
+
+    assert get_dp() is second
+
+    def current():
+        Dispatcher.set_current(first)
+        return get_dp()
+
+    # Current dispatcher is set in copied context, so it does not leak to other tests
+    assert contextvars.copy_context().run(current) is first
+
+
+class ExplicitMenu(Markup):
+    __text__ = 'Explicit menu'
+
+    item = Button('Explicit item')
+
+
+@pytest.mark.asyncio
+async def test_process_by_explicit_dispatcher():
+    first = Dispatcher(FakeBot('1:faketoken'), storage=MemoryStorage())
+    second = Dispatcher(FakeBot('2:faketoken'), storage=MemoryStorage())
+    setup_aiogram_keyboards(first)
+    setup_aiogram_keyboards(second)
+
+    message = make_message(chat_id=80)
+
+    await ExplicitMenu.process(message, 'm', dp=first)
+    await Markup.process_ordered(message, ExplicitMenu, dp=first)
+
+    assert len(first.bot.calls_of('sendMessage')) == 2
+    assert not second.bot.calls_of('sendMessage')
+    assert await first.storage.get_state(chat=80, user=80) == ExplicitMenu.__core__.definition_scope.state
+    assert await second.storage.get_state(chat=80, user=80) is None
@@ -32,3 +32,40 @@ async def test_text(dp):
     assert not await scope.filter(Message(text='other'))
     assert await scope.filter(Message(text='other text.'))
     assert await scope.filter(Message(text='start'))
+
+
+@pytest.mark.asyncio
+async def test_commands_case_and_args(dp):
+    scope = DefinitionScope(commands='Start')
+
+    result = await scope.filter(Message(text='/START payload'))
+
+    assert result
+    assert not await scope.filter(Message(text='!start'))
+
+
+def test_conflicts():
+    scope = DefinitionScope(state='s', commands=['a', 'b'])
+
+    assert scope.is_conflicts(DefinitionScope(state='s', commands=['b']))
+    assert not scope.is_conflicts(DefinitionScope(state='s', commands=['c']))
+    assert not scope.is_conflicts(DefinitionScope(state='s'))
+    assert DefinitionScope(state='s').is_conflicts(DefinitionScope(state='s'))
+
+
+@pytest.mark.asyncio
+async def test_filter_compiled_once(dp):
+    scope = DefinitionScope(commands=['start'])
+    compiled = scope.filter
+
+    assert scope.filter is compiled
+
+    scope.text = ['start']
+
+    assert scope.filter is not compiled
+    assert not await scope.filter(Message(text='/start'))
+
+    scope.text = None
+    scope.commands = ['ex']
+
+    assert await scope.filter(Message(text='/ex'))
@@ -0,0 +1,87 @@
+import pytest
+
+from aiogram import Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
+from aiogram.utils.exceptions import MessageCantBeEdited, MessageToEditNotFound, RetryAfter
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.testing import FakeBot
+
+
+item = Button('Fake bot item')
+
+
+@pytest.mark.asyncio
+async def test_send_and_edit():
+    bot = FakeBot()
+
+    sent = await bot.send_message(10, 'first')
+    edited = await bot.edit_message_text('second', chat_id=10, message_id=sent.message_id,
+                                         reply_markup=InlineKeyboardMarkup().row(item.inline()))
+
+    assert isinstance(edited, Message)
+    assert edited.text == 'second'
+    assert edited.reply_markup.inline_keyboard[0][0].text == 'Fake bot item'
+    assert await bot.answer_callback_query('1')
+    assert [i.method for i in bot.calls] == ['sendMessage', 'editMessageText', 'answerCallbackQuery']
+
+
+@pytest.mark.asyncio
+async def test_injected_errors():
+    bot = FakeBot()
+    bot.inject('editMessageText', MessageCantBeEdited("Message can't be edited"), times=1)
+    bot.inject('sendMessage', lambda: RetryAfter(3), rate=0.0)
+
+    sent = await bot.send_message(10, 'text')
+
+    with pytest.raises(MessageCantBeEdited):
+        await bot.edit_message_text('text', chat_id=10, message_id=sent.message_id)
+
+    await bot.edit_message_text('text', chat_id=10, message_id=sent.message_id)
+
+    assert len(bot.calls_of('editMessageText')) == 2
+
+    with pytest.raises(MessageToEditNotFound):
+        await bot.edit_message_text('text', chat_id=10, message_id=100)
+
+
+@pytest.mark.asyncio
+async def test_messages_bounded():
+    bot = FakeBot(max_messages=2)
+    sent = [await bot.send_message(10, f'text {i}') for i in range(3)]
+
+    assert len(bot.messages) == 2
+
+    with pytest.raises(MessageToEditNotFound):
+        await bot.edit_message_text('text', chat_id=10, message_id=sent[0].message_id)
+
+    await bot.edit_message_text('text', chat_id=10, message_id=sent[2].message_id)
+
+    bot.reset()
+
+    assert len(bot.messages) == 0 and not bot.calls
+
+
+class FakeBotMenu(Markup):
+    __text__ = 'Fake bot menu'
+
+    item = Button('Fake bot menu item')
+
+
+@pytest.mark.asyncio
+async def test_edit_fallback_sends_message():
+    bot = FakeBot()
+    setup_aiogram_keyboards(Dispatcher(bot, storage=MemoryStorage()))
+
+    call = CallbackQuery(**{
+        'id': '1',
+        'from': {'id': 11, 'is_bot': False, 'first_name': 'User'},
+        'chat_instance': '1',
+        'data': FakeBotMenu.item.inline().callback_data,
+        'message': {'message_id': 5, 'date': 0, 'chat': {'id': 11, 'type': 'private'}},
+    })
+
+    await FakeBotMenu.process(call)
+
+    assert [i.method for i in bot.calls] == ['editMessageText', 'sendMessage']
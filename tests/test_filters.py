@@ -0,0 +1,71 @@
+import pytest
+
+from aiogram_markups import Markup, Button
+from aiogram_markups.core.filters import AllOf, AnyOf, ContentFilter, compile_filter
+from aiogram_markups.core.limits import KeyboardLimits, Overflow
+from aiogram_markups.core.utils import BoolFilter, CurrentStateFilter, ValidatorFilter
+
+from .conftest import make_message
+
+
+Big = type('Big', (Markup,), {'__limits__': KeyboardLimits(overflow=Overflow.TRUNCATE),
+                             **{f'b{n}': Button(f'Big button {n}') for n in range(200)}})
+
+
+def test_constants_folded():
+    content = ContentFilter([Button('Folded')])
+
+    assert compile_filter(AllOf(BoolFilter(True), content)) is content
+    assert compile_filter(AllOf(BoolFilter(False), content)).boolean is False
+    assert compile_filter(AnyOf(BoolFilter(False), content)) is content
+    assert compile_filter(AnyOf(content, BoolFilter(True))).boolean is True
+
+
+def test_markup_filter_is_flat():
+    class Flat(Markup):
+        first = Button('Flat first')
+        second = Button('Flat second')
+
+    result = Flat.filter()
+
+    assert isinstance(result, AllOf)
+    assert [type(i) for i in result.filters] == [ContentFilter, CurrentStateFilter]
+    assert len(result.filters[0].buttons) == 2
+
+
+@pytest.mark.asyncio
+async def test_content_filter():
+    result = compile_filter(Big.__core__.filter(include_scope=False))
+
+    assert isinstance(result, ContentFilter)
+    assert await result.check(make_message('Big button 150'))
+    assert not await result.check(make_message('Big button 201'))
+
+
+def test_cheapest_first():
+    content = ContentFilter([Button('Cheap')])
+    validator = ValidatorFilter(lambda meta: True)
+    state = CurrentStateFilter('*')
+
+    result = compile_filter(AllOf(validator, state, content))
+
+    assert result.filters == [content, state, validator]
+
+
+@pytest.mark.asyncio
+async def test_adaptive_reorder(monkeypatch):
+    monkeypatch.setattr(AllOf, 'ADAPTIVE', True)
+    monkeypatch.setattr(AllOf, 'ADAPTIVE_PERIOD', 10)
+
+    def often_true(_):
+        return True
+
+    def often_false(_):
+        return False
+
+    result = AllOf(often_true, often_false)
+
+    for _ in range(10):
+        await result.check(make_message('text'))
+
+    assert result.filters == [often_false, often_true]
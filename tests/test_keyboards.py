@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from aiogram import Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.configuration import get_dp
+from aiogram_markups.core.middleware import KeyboardStatesMiddleware
+from aiogram_markups.core.keyboards import MemoryKeyboardStore, set_keyboard_store
+from aiogram_markups.testing import FakeBot
+
+from .conftest import make_message
+
+
+class KeyboardMenu(Markup):
+    __text__ = 'Keyboard menu'
+
+    first = Button('Keyboard first')
+
+
+class KeyboardSilent(Markup):
+    __text__ = None
+
+    first = Button('Keyboard first')
+
+
+class KeyboardOther(Markup):
+    __text__ = 'Keyboard other'
+
+    second = Button('Keyboard second')
+
+
+@pytest.fixture
+def bot():
+    bot = FakeBot()
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    setup_aiogram_keyboards(dp)
+    set_keyboard_store(MemoryKeyboardStore())
+
+    yield bot
+
+    set_keyboard_store(None)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_keyboard_skipped(bot):
+    message = make_message(chat_id=70)
+
+    await KeyboardMenu.process(message, 'm')
+    await KeyboardMenu.process(message, 'm')
+    await KeyboardMenu.process(message, 'm', force=True)
+    await KeyboardOther.process(message, 'm')
+    await KeyboardOther.process(make_message(chat_id=71), 'm')
+
+    sent = bot.calls_of('sendMessage')
+
+    assert [('reply_markup' in i) for i in sent] == [True, False, True, True, True]
+    assert sent[1]['text'] == 'Keyboard menu'
+
+
+@pytest.mark.asyncio
+async def test_nothing_to_send(bot):
+    message = make_message(chat_id=72)
+
+    await KeyboardSilent.process(message, 'm')
+    result = await KeyboardSilent.process(message, 'm')
+
+    assert result is None
+    assert len(bot.calls_of('sendMessage')) == 1
+
+
+@pytest.mark.asyncio
+async def test_keyboard_resent_after_press(bot):
+    message = make_message(chat_id=74)
+    middleware = KeyboardStatesMiddleware(get_dp())
+
+    await KeyboardMenu.process(message, 'm')
+    await middleware.on_pre_process_message(make_message(chat_id=74), {})
+    await KeyboardMenu.process(message, 'm')
+
+    assert all('reply_markup' in i for i in bot.calls_of('sendMessage'))
+
+
+@pytest.mark.asyncio
+async def test_store_disabled(bot):
+    set_keyboard_store(None)
+
+    message = make_message(chat_id=73)
+
+    await KeyboardMenu.process(message, 'm')
+    await KeyboardMenu.process(message, 'm')
+
+    assert all('reply_markup' in i for i in bot.calls_of('sendMessage'))
+
+
+@pytest.mark.asyncio
+async def test_keyboards_kept_per_bot(bot):
+    first_dp = get_dp()
+    other = FakeBot('2:faketoken')
+    other_dp = Dispatcher(other, storage=MemoryStorage())
+    setup_aiogram_keyboards(other_dp)
+    message = make_message(chat_id=75)
+
+    async def send(dp):
+        Dispatcher.set_current(dp)  # task has own copy of context
+
+        await KeyboardMenu.process(message, 'm')
+
+    await asyncio.create_task(send(first_dp))
+    await asyncio.create_task(send(other_dp))
+    await asyncio.create_task(send(other_dp))
+    await KeyboardStatesMiddleware(other_dp).on_pre_process_message(make_message(chat_id=75), {})
+    await asyncio.create_task(send(other_dp))
+
+    assert ['reply_markup' in i for i in other.calls_of('sendMessage')] == [True, False, True]
+    assert ['reply_markup' in i for i in bot.calls_of('sendMessage')] == [True]
@@ -0,0 +1,158 @@
+import pytest
+
+from aiogram_markups import Markup, Button
+from aiogram_markups.core.limits import KeyboardLimits, KeyboardLimitExceeded, Overflow
+from aiogram_markups.core.markup_scheme import MarkupSchemeButton
+from aiogram_markups.core.metrics import metrics
+
+from .conftest import make_meta
+
+
+class Products(Markup):
+    __limits__ = KeyboardLimits(overflow=Overflow.TRUNCATE)
+
+    produced = []
+
+    back = Button('Products back')
+
+    def markup_construct(self, meta, constructor):
+        for i in range(1000):
+            self.produced.append(i)
+            yield [MarkupSchemeButton(f'Product {i}', f'product:{i}')]
+
+
+class AsyncProducts(Markup):
+    __limits__ = KeyboardLimits(row_width=2, buttons=6, overflow=Overflow.TRUNCATE)
+
+    back = Button('Async products back')
+
+    async def markup_construct(self, meta, constructor):
+        for i in range(3):
+            yield [MarkupSchemeButton(f'Async product {i}.{j}', f'product:{i}.{j}') for j in range(3)]
+
+
+class StrictProducts(Markup):
+    __limits__ = KeyboardLimits(buttons=3)
+
+    closed = []
+
+    strict = Button('Strict back')
+
+    async def markup_construct(self, meta, constructor):
+        try:
+            for i in range(5):
+                yield [MarkupSchemeButton(f'Strict product {i}', f'product:{i}')]
+        finally:
+            self.closed.append(True)
+
+
+class Exact(Markup):
+    __limits__ = KeyboardLimits(buttons=3, overflow=Overflow.TRUNCATE)
+
+    exact = Button('Exact back')
+
+    def markup_construct(self, meta, constructor):
+        for i in range(2):
+            yield [MarkupSchemeButton(f'Exact product {i}', f'product:{i}')]
+
+
+class LongData(Markup):
+    long = Button('Long data back')
+
+    def markup_construct(self, meta, constructor):
+        yield [MarkupSchemeButton('Long', 'x' * 65)]
+
+
+@pytest.mark.asyncio
+async def test_generator_stops_at_limit():
+    truncated = metrics.counters.get('keyboard.truncated', 0)
+    markup = await Products.get_inline_markup(make_meta())
+
+    assert sum(len(i) for i in markup.inline_keyboard) == 100
+    assert metrics.counters['keyboard.truncated'] == truncated + 1
+    assert markup.inline_keyboard[0][0].text == 'Products back'
+    assert len(Products.produced) == 100  # first row over limit stops generator
+
+
+@pytest.mark.asyncio
+async def test_async_generator_rows_wrapped():
+    markup = await AsyncProducts.get_inline_markup(make_meta())
+
+    assert [len(i) for i in markup.inline_keyboard] == [1, 2, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_overflow_raise():
+    truncated = metrics.counters.get('keyboard.truncated', 0)
+
+    with pytest.raises(KeyboardLimitExceeded):
+        await StrictProducts.get_inline_markup(make_meta())
+
+    assert StrictProducts.closed == [True]
+    assert metrics.counters.get('keyboard.truncated', 0) == truncated
+
+
+@pytest.mark.asyncio
+async def test_full_keyboard_not_truncated():
+    truncated = metrics.counters.get('keyboard.truncated', 0)
+    markup = await Exact.get_inline_markup(make_meta())
+
+    assert sum(len(i) for i in markup.inline_keyboard) == 3
+    assert metrics.counters.get('keyboard.truncated', 0) == truncated
+
+
+@pytest.mark.asyncio
+async def test_callback_data_limit():
+    with pytest.raises(KeyboardLimitExceeded):
+        await LongData.get_inline_markup(make_meta())
+
+    markup = await LongData.get_markup(make_meta())  # reply keyboard sends no callback data
+
+    assert markup.keyboard[1][0].text == 'Long'
+
+
+def test_static_limits_checked_on_definition():
+    with pytest.raises(KeyboardLimitExceeded):
+        class Crowded(Markup):
+            __limits__ = KeyboardLimits(buttons=2)
+
+            first = Button('Crowded first')
+            second = Button('Crowded second')
+            third = Button('Crowded third')
+
+    with pytest.raises(KeyboardLimitExceeded):
+        class Empty(Markup):
+            blank = Button(' ')
+
+
+class Truncated(Markup):
+    __limits__ = KeyboardLimits(buttons=2, overflow=Overflow.TRUNCATE)
+
+    first = Button('Truncated first')
+    second = Button('Truncated second')
+    third = Button('Truncated third')
+
+
+@pytest.mark.asyncio
+async def test_static_overflow_truncated():
+    markup = await Truncated.get_inline_markup(make_meta())
+
+    assert sum(len(i) for i in markup.inline_keyboard) == 2
+
+
+class Constructed(Markup):
+    __limits__ = KeyboardLimits(buttons=3, overflow=Overflow.TRUNCATE)
+
+    first = Button('Constructed first')
+
+    async def markup_construct(self, meta, constructor):
+        constructor.rows.extend([[MarkupSchemeButton(f'Constructed {i}', f'c:{i}')] for i in range(5)])
+
+        return True
+
+
+@pytest.mark.asyncio
+async def test_constructed_rows_fitted():
+    markup = await Constructed.get_inline_markup(make_meta())
+
+    assert sum(len(i) for i in markup.inline_keyboard) == 3
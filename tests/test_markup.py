@@ -0,0 +1,194 @@
+import time
+import threading
+
+import pytest
+
+from aiogram import Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Message, Update, CallbackQuery
+
+from aiogram_markups import Markup, Button, TextTemplate, blocking, setup_aiogram_keyboards
+from aiogram_markups.testing import FakeBot
+from aiogram_markups.core.dialog_meta import DialogMeta
+
+from .conftest import make_meta
+
+
+class CachedMenu(Markup):
+    __construct_ttl__ = 60
+
+    constructed = []
+
+    first = Button('Cached menu first')
+
+    async def markup_construct(self, meta, constructor):
+        self.constructed.append(meta.from_user.language_code)
+
+        return True
+
+    def construct_cache_key(self, meta):
+        return meta.from_user.language_code
+
+
+@pytest.mark.asyncio
+async def test_construct_cache():
+    await CachedMenu.get_markup(make_meta(language_code='en'))
+    await CachedMenu.get_markup(make_meta(language_code='en'))
+    await CachedMenu.get_markup(make_meta(language_code='ru'))
+
+    assert CachedMenu.constructed == ['en', 'ru']
+
+    Markup.invalidate_construct('en')
+    markup = await CachedMenu.get_markup(make_meta(language_code='en'))
+
+    assert CachedMenu.constructed == ['en', 'ru', 'en']
+    assert markup.keyboard[0][0].text == 'Cached menu first'
+
+
+class Greeting(Markup):
+    __text__ = TextTemplate('Hi, {meta.from_user.first_name}! Balance: {balance:.1f}')
+
+    async def text_values(self, meta):
+        return {'balance': 2}
+
+
+class CachedText(Markup):
+    __text_ttl__ = 60
+
+    built = []
+
+    async def __text__(self, meta):
+        self.built.append(meta.content)
+        return f'Built for {meta.content}'
+
+    def text_cache_key(self, meta):
+        return meta.chat_id
+
+
+@pytest.mark.asyncio
+async def test_text_template():
+    assert await Greeting.__core__.render_text(make_meta()) == 'Hi, User! Balance: 2.0'
+
+
+def test_text_template_positional_fields():
+    with pytest.raises(ValueError):
+        TextTemplate('Hi, {}!')
+
+
+@pytest.mark.asyncio
+async def test_text_cache():
+    assert await CachedText.__core__.render_text(make_meta('first')) == 'Built for first'
+    assert await CachedText.__core__.render_text(make_meta('second')) == 'Built for first'
+    assert CachedText.built == ['first']
+
+
+class LocalizedMenu(Markup):
+    settings = Button('Localized settings', labels={'ru': 'Настройки'})
+
+
+@pytest.mark.asyncio
+async def test_localized_labels_render():
+    ru = await LocalizedMenu.get_inline_markup(make_meta(language_code='ru'))
+    en = await LocalizedMenu.get_inline_markup(make_meta(language_code='en'))
+
+    assert ru.inline_keyboard[0][0].text == 'Настройки'
+    assert en.inline_keyboard[0][0].text == 'Localized settings'
+    assert ru.inline_keyboard[0][0].callback_data == en.inline_keyboard[0][0].callback_data
+
+
+@pytest.mark.asyncio
+async def test_localized_render_without_sender():
+    meta = DialogMeta(Message(**{'message_id': 1, 'date': 0, 'chat': {'id': -10, 'type': 'channel'}, 'text': 'text'}))
+    markup = await LocalizedMenu.get_inline_markup(meta)
+
+    assert meta.locale is None
+    assert markup.inline_keyboard[0][0].text == 'Localized settings'
+
+
+class BlockingText(Markup):
+    threads = []
+
+    item = Button('Blocking item')
+
+    @blocking
+    def __text__(self, meta):
+        self.threads.append(threading.current_thread().name)
+        time.sleep(0.01)
+
+        return f'Hi, {meta.from_user.first_name}'
+
+    @blocking
+    def markup_construct(self, meta, constructor):
+        self.threads.append(threading.current_thread().name)
+
+        return True
+
+
+@pytest.mark.asyncio
+async def test_blocking_hooks_run_in_pool():
+    BlockingText._synchronize_magic_fields()
+    meta = make_meta()
+
+    assert await BlockingText.__core__.render_text(meta) == 'Hi, User'
+    assert (await BlockingText.get_markup(meta)).keyboard[0][0].text == 'Blocking item'
+    assert all(i.startswith('markups-blocking') for i in BlockingText.threads)
+    assert len(BlockingText.threads) == 2
+
+
+class PressedMenu(Markup):
+    __state__ = '*'
+
+    first = Button('Pressed menu first', data='first')
+
+
+@pytest.mark.asyncio
+async def test_handler_reuses_detected_button(monkeypatch):
+    dp = Dispatcher(FakeBot(), storage=MemoryStorage())
+    setup_aiogram_keyboards(dp)
+
+    lookups = []
+    lookup = Button.from_telegram_object
+
+    async def counted(obj):
+        lookups.append(obj)
+
+        return await lookup(obj)
+
+    monkeypatch.setattr(Button, 'from_telegram_object', counted)
+
+    message = make_meta('Pressed menu first').source
+    await dp.updates_handler.notify(Update(update_id=1, message=message.to_python()))
+
+    assert len(lookups) == 1  # by middleware only, handlers and validators reuse it
+
+
+class BoundSettings(Markup):
+    __text__ = 'Settings'
+
+    language = Button('Bound language', labels={'ru': 'Язык'})
+
+
+class BoundMenu(Markup):
+    settings = Button('Bound settings') >> BoundSettings
+
+
+@pytest.mark.asyncio
+async def test_bound_button_rendered_in_user_locale():
+    bot = FakeBot()
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    setup_aiogram_keyboards(dp)
+
+    call = CallbackQuery(**{
+        'id': '1',
+        'from': {'id': 10, 'is_bot': False, 'first_name': 'User', 'language_code': 'ru'},
+        'chat_instance': '1',
+        'data': BoundMenu.settings.inline().callback_data,
+        'message': {'message_id': 1, 'date': 0, 'chat': {'id': 10, 'type': 'private'},
+                    'from': {'id': 1, 'is_bot': True, 'first_name': 'Bot'}, 'text': 'Menu'},
+    })
+
+    await dp.updates_handler.notify(Update(update_id=1, callback_query=call.to_python()))
+
+    sent = bot.calls_of('editMessageText') + bot.calls_of('sendMessage')  # unknown message is sent anew
+
+    assert sent and all('Язык' in i['reply_markup'] for i in sent)
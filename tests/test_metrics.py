@@ -0,0 +1,64 @@
+import time
+import asyncio
+
+import pytest
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from aiogram_markups import setup_aiogram_keyboards, shutdown_aiogram_keyboards
+from aiogram_markups.configuration import DISPATCHERS
+from aiogram_markups.core.metrics import Metrics, LoopLagMonitor
+from aiogram_markups.core.middleware import KeyboardStatesMiddleware
+
+
+def test_percentile():
+    target = Metrics()
+
+    for i in range(1, 101):
+        target.observe('event', i)
+
+    assert target.percentile('event', 50) == 51
+    assert target.percentile('event', 99) == 100
+    assert target.percentile('missing', 50) is None
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_observed():
+    target = Metrics()
+    monitor = LoopLagMonitor(interval=0.01, target=target)
+    monitor.start()
+
+    await asyncio.sleep(0.02)
+    time.sleep(0.05)  # block loop
+    await asyncio.sleep(0.02)
+
+    monitor.stop()
+
+    assert max(target.timings['loop.lag']) >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_one_monitor_per_loop():
+    dispatchers = [Dispatcher(Bot('1:faketoken')) for _ in range(2)]
+    middlewares = []
+
+    for dp in dispatchers:
+        setup_aiogram_keyboards(dp, loop_lag_interval=0.01)
+        middleware = [i for i in dp.middleware.applications if isinstance(i, KeyboardStatesMiddleware)][0]
+        await middleware.on_pre_process_update(Update(update_id=1), {})
+        middlewares.append(middleware)
+
+    monitor = middlewares[0]._monitor
+
+    assert monitor is middlewares[1]._monitor
+    assert monitor.users == 2
+
+    await shutdown_aiogram_keyboards(dispatchers[0])
+
+    assert monitor.is_running
+
+    await shutdown_aiogram_keyboards(dispatchers[1])
+
+    assert not monitor.is_running
+    assert dispatchers[1] not in DISPATCHERS
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+
+import pytest
+
+from aiogram import Dispatcher, Bot
+from aiogram.types import Chat, User, Update
+from aiogram.dispatcher.webhook import AnswerCallbackQuery
+from aiogram.dispatcher.handler import CancelHandler
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.core.middleware import KeyboardStatesMiddleware, BUTTON_KEY
+from aiogram_markups.testing import FakeBot
+
+from .conftest import make_message
+
+
+class TimeUnits(Markup):
+    __state__ = '*'
+
+    hour = Button('Middleware hour', data='h')
+
+
+class Voting(Markup):
+    __state__ = '*'
+    __debounce__ = 60
+
+    vote = Button('Middleware vote')
+
+
+@pytest.mark.asyncio
+async def test_button_resolved_once(monkeypatch):
+    dispatcher = Dispatcher(Bot('1:faketoken'))
+    setup_aiogram_keyboards(dispatcher)
+    middleware = KeyboardStatesMiddleware(dispatcher)
+    resolve = Button.from_telegram_object
+    calls = []
+
+    async def counting(obj):
+        calls.append(obj)
+        return await resolve(obj)
+
+    monkeypatch.setattr(Button, 'from_telegram_object', counting)
+
+    message = make_message('Middleware hour')
+    data = {}
+
+    Chat.set_current(message.chat)
+    User.set_current(message.from_user)
+
+    await middleware.on_pre_process_message(message, data)
+    await middleware.on_process_message(message, data)
+
+    assert data[BUTTON_KEY] is TimeUnits.hour
+    assert message.text == 'h'
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_debounce_drops_repeated_press():
+    dispatcher = Dispatcher(Bot('1:faketoken'))
+    setup_aiogram_keyboards(dispatcher)
+    middleware = KeyboardStatesMiddleware(dispatcher)
+
+    message = make_message('Middleware vote')
+
+    Chat.set_current(message.chat)
+    User.set_current(message.from_user)
+
+    await middleware.on_pre_process_message(message, {})
+
+    with pytest.raises(CancelHandler):
+        await middleware.on_pre_process_message(make_message('Middleware vote'), {})
+
+    data = {}
+    await middleware.on_pre_process_message(make_message('Middleware hour'), data)
+
+    assert data[BUTTON_KEY] is TimeUnits.hour
+
+
+@pytest.mark.asyncio
+async def test_webhook_callback_answer():
+    dispatcher = Dispatcher(Bot('1:faketoken'))
+    setup_aiogram_keyboards(dispatcher, answer_callbacks='webhook')
+
+    update = Update(**{
+        'update_id': 1,
+        'callback_query': {
+            'id': '42',
+            'from': {'id': 10, 'is_bot': False, 'first_name': 'User'},
+            'chat_instance': '1',
+            'data': TimeUnits.hour.inline().callback_data,
+            'message': {'message_id': 1, 'date': 0, 'chat': {'id': 10, 'type': 'private'}},
+        },
+    })
+
+    results = await dispatcher.updates_handler.notify(update)
+    answers = [i for i in results[-1] if isinstance(i, AnswerCallbackQuery)]
+
+    assert len(answers) == 1
+    assert answers[0].callback_query_id == '42'
+
+
+@pytest.mark.asyncio
+async def test_webhook_callback_answer_under_polling():
+    bot = FakeBot()
+    dispatcher = Dispatcher(bot)
+    setup_aiogram_keyboards(dispatcher, answer_callbacks='webhook')
+    dispatcher._polling = True
+
+    update = Update(**{
+        'update_id': 1,
+        'callback_query': {
+            'id': '43',
+            'from': {'id': 10, 'is_bot': False, 'first_name': 'User'},
+            'chat_instance': '1',
+            'data': TimeUnits.hour.inline().callback_data,
+            'message': {'message_id': 1, 'date': 0, 'chat': {'id': 10, 'type': 'private'}},
+        },
+    })
+
+    results = await dispatcher.updates_handler.notify(update)
+    await asyncio.sleep(0)
+
+    assert not any(isinstance(i, AnswerCallbackQuery) for i in itertools.chain.from_iterable(results))
+    assert [i['callback_query_id'] for i in bot.calls_of('answerCallbackQuery')] == ['43']
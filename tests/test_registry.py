@@ -0,0 +1,26 @@
+import pytest
+
+from aiogram_markups import Markup, Button
+from aiogram_markups.core.registry import StateRegistry, StateCollision
+
+
+class RegistryMenu(Markup):
+    first = Button('Registry first')
+    second = Button('Registry second')
+
+
+def test_state_names():
+    assert RegistryMenu.__core__.definition_scope.state == f'{__name__}.RegistryMenu'
+
+
+def test_state_collision():
+    states = StateRegistry()
+
+    states.register('shared')
+    states.register('shared')
+    states.register('owned', owner=RegistryMenu)
+
+    with pytest.raises(StateCollision):
+        states.register('owned', owner=Markup)
+    with pytest.raises(StateCollision):
+        states.register('shared', owner=RegistryMenu)
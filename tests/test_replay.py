@@ -0,0 +1,52 @@
+import pytest
+
+from aiogram import Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiogram_markups import Markup, Button, setup_aiogram_keyboards
+from aiogram_markups.testing import FakeBot, UpdatesRecorder, load_updates, replay
+
+from .conftest import make_update
+
+
+class ReplaySettings(Markup):
+    __text__ = 'Replay settings'
+
+    back = Button('Replay back')
+
+
+class ReplayMenu(Markup):
+    __state__ = '*'
+    __text__ = 'Replay menu'
+
+    open = Button('Replay open')
+
+    async def handler(self, meta):
+        await ReplaySettings.process(meta.source)
+
+
+@pytest.mark.asyncio
+async def test_record_and_replay(tmp_path):
+    path = str(tmp_path / 'updates.jsonl')
+    async with UpdatesRecorder(path) as recorder:
+        for i in range(1, 11):
+            await recorder.on_pre_process_update(make_update('Replay open' if i % 2 else 'hello',
+                                                             update_id=i, chat_id=i), {})
+
+    await recorder.on_pre_process_update(make_update('after close', update_id=11), {})
+
+    updates = load_updates(path)
+
+    assert [i.update_id for i in updates] == list(range(1, 11))
+
+    dp = Dispatcher(FakeBot(), storage=MemoryStorage())
+    setup_aiogram_keyboards(dp)
+
+    report = await replay(dp, updates, concurrency=4)
+
+    assert report.updates == 10
+    assert report.errors == 0
+    assert report.api_calls == 5
+    assert report.api_calls_per_update == 0.5
+    assert f'{ReplayMenu.__module__}.ReplayMenu' in report.latencies
+    assert 'updates/s' in str(report)
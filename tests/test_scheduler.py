@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from aiogram import Dispatcher
+from aiogram.dispatcher.handler import CancelHandler
+from aiogram.dispatcher.middlewares import BaseMiddleware
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.types import Message, Update
+
+from aiogram_markups import setup_aiogram_keyboards
+from aiogram_markups.core.scheduler import ChatScheduler
+from aiogram_markups.testing import FakeBot
+
+from .conftest import make_message
+
+
+@pytest.mark.asyncio
+async def test_one_update_per_chat():
+    scheduler = ChatScheduler(per_chat=1, max_concurrency=10)
+    running = {10: 0, 20: 0}
+    peaks = {10: 0, 20: 0}
+
+    async def handler(message: Message):
+        chat_id = message.chat.id
+
+        async with scheduler.slot(scheduler.chat_key(message)):
+            running[chat_id] += 1
+            peaks[chat_id] = max(peaks[chat_id], running[chat_id])
+            await asyncio.sleep(0.01)
+            running[chat_id] -= 1
+
+    await asyncio.gather(*[handler(make_message(chat_id=i)) for i in (10, 10, 20, 20, 10)])
+
+    assert peaks == {10: 1, 20: 1}
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_global_limit():
+    scheduler = ChatScheduler(per_chat=2, max_concurrency=2)
+    running = 0
+    peak = 0
+
+    async def handler(message: Message):
+        nonlocal running, peak
+
+        async with scheduler.slot(scheduler.chat_key(message)):
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*[handler(make_message(chat_id=i)) for i in range(6)])
+
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_acquire_leaves_no_entry():
+    scheduler = ChatScheduler(per_chat=1)
+    ticket = await scheduler.acquire(10)
+    waiter = asyncio.ensure_future(scheduler.acquire(10))
+
+    await asyncio.sleep(0)
+    waiter.cancel()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    ticket.release()
+    ticket.release()
+
+    assert len(scheduler) == 0
+
+
+@pytest.mark.asyncio
+async def test_filters_run_within_chat_slot():
+    scheduler = ChatScheduler(per_chat=1)
+    dp = Dispatcher(FakeBot(), storage=MemoryStorage())
+    setup_aiogram_keyboards(dp, scheduler=scheduler)
+
+    running = 0
+    peak = 0
+
+    async def slow_filter(message: Message):
+        nonlocal running, peak
+
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+        return False
+
+    dp.register_message_handler(lambda message: None, slow_filter, state='*')
+
+    updates = [Update(update_id=i, message=make_message(chat_id=30).to_python()) for i in range(3)]
+    await dp.process_updates(updates)
+
+    assert peak == 1
+    assert len(scheduler) == 0
+
+
+class Cancelling(BaseMiddleware):
+    def __init__(self, stage: str):
+        self.stage = stage
+
+        super().__init__()
+
+    async def trigger(self, action, args):
+        if action == self.stage:
+            raise CancelHandler()
+
+        return await super().trigger(action, args)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('stage', ['pre_process_update', 'process_update'])
+async def test_slot_released_when_update_cancelled(stage):
+    scheduler = ChatScheduler(per_chat=1)
+    dp = Dispatcher(FakeBot(), storage=MemoryStorage())
+    setup_aiogram_keyboards(dp, scheduler=scheduler)
+    dp.setup_middleware(Cancelling(stage))
+
+    updates = [Update(update_id=i, message=make_message(chat_id=40).to_python()) for i in range(2)]
+    await asyncio.wait_for(dp.process_updates(updates), 1)
+
+    assert len(scheduler) == 0
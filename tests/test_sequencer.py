@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from aiogram import Dispatcher, Bot
+from aiogram.types import Message
+
+from aiogram_markups.core.markup_core import process_ordered
+from aiogram_markups.core.sequencer import ChatSequencer
+
+
+@pytest.mark.asyncio
+async def test_sends_in_reservation_order():
+    sequencer = ChatSequencer()
+    sent = []
+
+    async def run(n, slot):
+        await asyncio.sleep(0.01 * (3 - n))  # later ones render faster
+
+        async with slot:
+            sent.append(n)
+
+    await asyncio.gather(*[run(n, sequencer.reserve(10)) for n in range(3)])
+
+    assert sent == [0, 1, 2]
+    assert len(sequencer) == 0
+
+
+@pytest.mark.asyncio
+async def test_early_release_keeps_order():
+    sequencer = ChatSequencer()
+    first, second, third = [sequencer.reserve(10) for _ in range(3)]
+
+    second.release()  # e.g. render failed
+    waiter = asyncio.ensure_future(third.wait())
+    await asyncio.sleep(0)
+
+    assert not waiter.done()
+
+    first.release()
+    await waiter
+    third.release()
+
+    assert len(sequencer) == 0
+
+
+class _Core:
+    def __init__(self, name, sent, delay=0.0, error=None):
+        self.name = name
+        self.sent = sent
+        self.delay = delay
+        self.error = error
+
+    async def render(self, raw_meta):
+        await asyncio.sleep(self.delay)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.name
+
+    async def send(self, rendered, force=False, dp=None):
+        self.sent.append(rendered)
+
+        return rendered
+
+
+@pytest.mark.asyncio
+async def test_ordered_failure_keeps_earlier_markups():
+    sent = []
+    message = Message(**{'message_id': 1, 'date': 0, 'chat': {'id': 20, 'type': 'private'},
+                         'from': {'id': 20, 'is_bot': False, 'first_name': 'User'}})
+    cores = [_Core('first', sent, delay=0.02),
+             _Core('second', sent, error=ValueError('render failed')),
+             _Core('third', sent)]
+
+    with pytest.raises(ValueError):
+        await process_ordered(cores, message, Dispatcher(Bot('1:faketoken')))
+
+    assert sent == ['first']
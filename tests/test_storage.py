@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from aiogram import Dispatcher, Bot
+from aiogram.types import Message
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiogram_markups import setup_aiogram_keyboards
+from aiogram_markups.core.storage import BufferedStorage
+
+from .conftest import make_update
+
+
+class CountingStorage(MemoryStorage):
+    """ In-memory stand-in for remote storage, that counts requests """
+
+    def __init__(self):
+        super().__init__()
+
+        self.reads = 0
+        self.writes = 0
+
+    async def get_state(self, **kwargs):
+        self.reads += 1
+        return await super().get_state(**kwargs)
+
+    async def set_state(self, **kwargs):
+        self.writes += 1
+        return await super().set_state(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_state_loaded_and_saved_once():
+    remote = CountingStorage()
+    dispatcher = Dispatcher(Bot('1:faketoken'), storage=remote)
+    setup_aiogram_keyboards(dispatcher, buffer_states=True)
+
+    assert isinstance(dispatcher.storage, BufferedStorage)
+
+    seen = []
+
+    @dispatcher.message_handler(state='*')
+    async def handler(message: Message):
+        state = dispatcher.current_state(chat=message.chat.id, user=message.from_user.id)
+
+        for _ in range(3):
+            seen.append(await state.get_state())
+
+        await state.set_state('first')
+        await state.set_state('second')
+        seen.append(await state.get_state())
+
+        assert remote.writes == 0
+
+    await dispatcher.updates_handler.notify(make_update('plain text'))
+
+    assert seen == [None, None, None, 'second']
+    assert remote.reads == 1
+    assert remote.writes == 1
+    assert await remote.get_state(chat=10, user=10) == 'second'
+
+
+@pytest.mark.asyncio
+async def test_update_data_flushed_as_delta():
+    remote = MemoryStorage()
+    dispatcher = Dispatcher(Bot('1:faketoken'), storage=remote)
+    setup_aiogram_keyboards(dispatcher, buffer_states=True)
+
+    await remote.set_data(chat=10, user=10, data={'kept': 1})
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    @dispatcher.message_handler(state='*')
+    async def handler(message: Message):
+        state = dispatcher.current_state(chat=message.chat.id, user=message.from_user.id)
+        await state.update_data({message.text: True})
+
+        if message.text == 'slow':
+            started.set()
+            await release.wait()
+        else:
+            assert await state.get_data() == {'kept': 1, 'fast': True}
+
+    slow = asyncio.create_task(dispatcher.updates_handler.notify(make_update('slow')))
+    await started.wait()
+    await dispatcher.updates_handler.notify(make_update('fast'))
+    release.set()
+    await slow
+
+    assert await remote.get_data(chat=10, user=10) == {'kept': 1, 'fast': True, 'slow': True}
+
+
+@pytest.mark.asyncio
+async def test_storage_passes_through_after_update():
+    remote = MemoryStorage()
+    dispatcher = Dispatcher(Bot('1:faketoken'), storage=remote)
+    setup_aiogram_keyboards(dispatcher, buffer_states=True)
+
+    release = asyncio.Event()
+    tasks = []
+
+    async def background(chat, user):
+        await release.wait()
+        await dispatcher.storage.set_state(chat=chat, user=user, state='late')
+
+    @dispatcher.message_handler(state='*')
+    async def handler(message: Message):
+        tasks.append(asyncio.create_task(background(message.chat.id, message.from_user.id)))
+
+    await dispatcher.updates_handler.notify(make_update('plain text'))
+    release.set()
+    await tasks[0]
+
+    assert await remote.get_state(chat=10, user=10) == 'late'
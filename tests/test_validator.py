@@ -0,0 +1,74 @@
+import inspect
+
+import pytest
+
+from aiogram_markups import Button
+from aiogram_markups.builtin import String, Integer, Float
+from aiogram_markups.core.dialog_meta import DialogMeta
+from aiogram_markups.core.context import open_context, close_context
+from aiogram_markups.core.metrics import metrics
+from aiogram_markups.core.utils import is_synchronous, pure, run_validator, ValidatorFilter
+
+from .conftest import make_meta
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('12', True), ('-3', True), ('1.5', False), ('abc', False)
+])
+def test_integer(text, expected):
+    assert Integer().check(make_meta(text)) is expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('12', True), ('-1.5', True), ('.5', True), ('1e3', True),
+    ('1.2.3', False), ('.', False), ('abc', False)
+])
+def test_float(text, expected):
+    assert Float().check(make_meta(text)) is expected
+
+
+@pytest.mark.asyncio
+async def test_validate_is_awaitable():
+    validator = String('yes')
+
+    assert await validator.validate(make_meta('yes'))
+    assert validator.get_validator() == validator.check
+
+
+@pytest.mark.asyncio
+async def test_synchronous_validator_filter():
+    validator = String(['yes', 'no']).get_validator()
+
+    assert is_synchronous(validator)
+    assert await ValidatorFilter(validator)(make_meta('yes').source)
+    assert not await ValidatorFilter(validator)(make_meta('maybe').source)
+
+
+@pytest.mark.asyncio
+async def test_pure_validator_memoized_within_update():
+    calls = []
+
+    @pure
+    async def expensive(meta: DialogMeta) -> bool:
+        calls.append(meta.content)
+        return True
+
+    meta = make_meta('query')
+    metas = [meta, DialogMeta(meta.source, button=Button('Pure validator button')), DialogMeta(meta.source)]
+    metrics.reset()
+    token = open_context()
+
+    try:
+        for i in metas:
+            result = run_validator(expensive, i)
+
+            if inspect.isawaitable(result):
+                result = await result
+
+            assert result is True
+    finally:
+        close_context(token)
+
+    assert calls == ['query']
+    assert metrics.counters['validator.memo.miss'] == 1
+    assert metrics.counters['validator.memo.hit'] == 2